@@ -9,7 +9,7 @@ import argparse
 import logging
 from typing import Optional
 
-from src.config.settings import Settings
+from src.config.settings import get_settings
 from src.config.logging import setup_logging
 from src.bot.core import TelegramBot
 
@@ -17,7 +17,7 @@ from src.bot.core import TelegramBot
 async def main(webhook: bool = False, webhook_url: Optional[str] = None) -> None:
     """Main application entry point."""
     # Load settings
-    settings = Settings()
+    settings = get_settings()
     
     # Setup logging
     setup_logging(settings.log_level, settings.debug)
@@ -59,5 +59,12 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
+    # Use uvloop's faster event loop when available (not on Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     # Run the bot
     asyncio.run(main(webhook=args.webhook, webhook_url=args.webhook_url))
\ No newline at end of file
@@ -3,10 +3,12 @@ Core Telegram Bot implementation
 """
 
 import logging
-from typing import Optional
+from typing import Any, Optional
 
+import orjson
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
@@ -14,10 +16,16 @@ from aiohttp import web
 from src.config.settings import Settings
 from src.bot.handlers import setup_handlers
 from src.bot.middleware import setup_middleware
+from src.bot.middleware.throttling import OutboundThrottleMiddleware
 from src.services.mailsac import MailsacService
 from src.services.gemini import GeminiService
 
 
+def _orjson_dumps(value: Any) -> str:
+    """Serialize Bot API payload fields with orjson."""
+    return orjson.dumps(value).decode()
+
+
 class TelegramBot:
     """Main Telegram Bot class."""
     
@@ -26,11 +34,14 @@ class TelegramBot:
         self.settings = settings
         self.logger = logging.getLogger(__name__)
         
-        # Initialize bot and dispatcher
+        # Initialize bot and dispatcher; orjson handles update and payload JSON
+        session = AiohttpSession(json_loads=orjson.loads, json_dumps=_orjson_dumps)
         self.bot = Bot(
             token=settings.telegram_bot_token,
+            session=session,
             default=DefaultBotProperties(parse_mode=ParseMode.HTML)
         )
+        self.bot.session.middleware(OutboundThrottleMiddleware())
         self.dp = Dispatcher()
         
         # Initialize services
@@ -40,7 +51,8 @@ class TelegramBot:
         )
         self.gemini_service = GeminiService(
             api_key=settings.google_ai_api_key,
-            model=settings.gemini_model
+            model=settings.gemini_model,
+            fast_model=settings.gemini_fast_model
         )
         
         # Setup middleware and handlers
@@ -90,5 +102,6 @@ class TelegramBot:
     async def shutdown(self) -> None:
         """Shutdown the bot gracefully."""
         self.logger.info("🛑 Shutting down bot...")
+        await self.mailsac_service.close()
         await self.bot.session.close()
         self.logger.info("✅ Bot shutdown complete")
\ No newline at end of file
@@ -3,6 +3,7 @@ Message handlers for non-command messages
 """
 
 import logging
+import re
 from typing import Any
 
 from aiogram import Router, F
@@ -14,15 +15,16 @@ from src.services.gemini import GeminiService
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Single-pass substring match; 'temp' also covers 'temporary'
+HELP_KEYWORDS = re.compile(r'help|how|what|email|temp', re.IGNORECASE)
+
 
 @router.message(F.text)
 async def text_message_handler(message: Message, gemini_service: GeminiService) -> None:
     """Handle regular text messages with AI assistance."""
     try:
         # Check if message looks like a question or request for help
-        text = message.text.lower()
-        
-        if any(word in text for word in ['help', 'how', 'what', 'email', 'temp', 'temporary']):
+        if HELP_KEYWORDS.search(message.text):
             # Provide helpful response about bot capabilities
             response = f"""
 🤖 {hbold('I can help you with temporary emails!')}
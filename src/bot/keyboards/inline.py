@@ -1,11 +1,17 @@
 """
 Inline keyboard layouts
+
+Markups are never mutated after building, so they are cached: static menus
+are built once, per-address and per-message ones are kept in a bounded LRU.
 """
 
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 
+@lru_cache(maxsize=None)
 def get_main_menu_keyboard() -> InlineKeyboardMarkup:
     """Get main menu inline keyboard."""
     builder = InlineKeyboardBuilder()
@@ -22,6 +28,7 @@ def get_main_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def get_email_actions_keyboard(email_address: str) -> InlineKeyboardMarkup:
     """Get email-specific actions keyboard."""
     builder = InlineKeyboardBuilder()
@@ -38,6 +45,7 @@ def get_email_actions_keyboard(email_address: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=4096)
 def get_message_actions_keyboard(message_id: str, email_address: str) -> InlineKeyboardMarkup:
     """Get message-specific actions keyboard."""
     builder = InlineKeyboardBuilder()
@@ -69,6 +77,7 @@ def get_message_actions_keyboard(message_id: str, email_address: str) -> InlineK
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_ai_features_keyboard() -> InlineKeyboardMarkup:
     """Get AI features menu keyboard."""
     builder = InlineKeyboardBuilder()
@@ -88,6 +97,7 @@ def get_ai_features_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_settings_keyboard() -> InlineKeyboardMarkup:
     """Get settings menu keyboard."""
     builder = InlineKeyboardBuilder()
@@ -107,6 +117,7 @@ def get_settings_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1024)
 def get_confirmation_keyboard(action: str, item_id: str) -> InlineKeyboardMarkup:
     """Get confirmation keyboard for destructive actions."""
     builder = InlineKeyboardBuilder()
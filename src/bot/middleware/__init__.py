@@ -9,5 +9,6 @@ from .services import ServicesMiddleware
 
 def setup_middleware(dp: Dispatcher, mailsac_service, gemini_service) -> None:
     """Setup all middleware."""
-    dp.message.middleware(ServicesMiddleware(mailsac_service, gemini_service))
-    dp.callback_query.middleware(ServicesMiddleware(mailsac_service, gemini_service))
\ No newline at end of file
+    services = ServicesMiddleware(mailsac_service, gemini_service)
+    dp.message.middleware(services)
+    dp.callback_query.middleware(services)
\ No newline at end of file
@@ -14,10 +14,15 @@ from src.services.gemini import GeminiService
 class ServicesMiddleware(BaseMiddleware):
     """Middleware to inject services into handlers."""
     
+    __slots__ = ("_inject",)
+    
     def __init__(self, mailsac_service: MailsacService, gemini_service: GeminiService):
         """Initialize services middleware."""
-        self.mailsac_service = mailsac_service
-        self.gemini_service = gemini_service
+        # Services live for the whole process, so the mapping is built once
+        self._inject = {
+            "mailsac_service": mailsac_service,
+            "gemini_service": gemini_service
+        }
     
     async def __call__(
         self,
@@ -26,7 +31,6 @@ class ServicesMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         """Inject services into handler data."""
-        data["mailsac_service"] = self.mailsac_service
-        data["gemini_service"] = self.gemini_service
+        data.update(self._inject)
         
         return await handler(event, data)
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Outbound request throttling for the Telegram Bot API
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from src.config.constants import APIConstants
+from src.bot.utils.rate_limiter import TokenBucket
+
+
+class OutboundThrottleMiddleware(BaseRequestMiddleware):
+    """Pace outgoing Bot API calls to stay under Telegram's flood limits.
+    
+    Bursts are smoothed by waiting for tokens instead of letting Telegram
+    answer with RetryAfter, which would stall every chat at once.
+    """
+    
+    def __init__(
+        self,
+        global_rate: int = APIConstants.TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = APIConstants.TELEGRAM_CHAT_RATE,
+        chat_burst: int = APIConstants.TELEGRAM_CHAT_BURST,
+        max_chats: int = APIConstants.TELEGRAM_MAX_TRACKED_CHATS
+    ):
+        """Initialize throttling middleware."""
+        self.global_bucket = TokenBucket(capacity=global_rate, refill_rate=global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_chats = max_chats
+        self.chat_buckets: "OrderedDict[Any, TokenBucket]" = OrderedDict()
+    
+    def _get_chat_bucket(self, chat_id: Any) -> TokenBucket:
+        """Get or create the bucket for a chat, dropping the least recent one when full."""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.max_chats:
+                self.chat_buckets.popitem(last=False)
+            bucket = TokenBucket(capacity=self.chat_burst, refill_rate=self.chat_rate)
+            self.chat_buckets[chat_id] = bucket
+        else:
+            self.chat_buckets.move_to_end(chat_id)
+        return bucket
+    
+    @staticmethod
+    async def _acquire(bucket: TokenBucket) -> None:
+        """Wait until a token can be taken from bucket."""
+        while not bucket.consume():
+            await asyncio.sleep(bucket.time_until_available())
+    
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        """Throttle methods that post into a chat; pass everything else through."""
+        chat_id: Optional[Any] = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            await self._acquire(self._get_chat_bucket(chat_id))
+            await self._acquire(self.global_bucket)
+        
+        return await make_request(bot, method)
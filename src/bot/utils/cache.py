@@ -3,9 +3,13 @@ Caching utilities for improved performance
 """
 
 import time
+import heapq
+import asyncio
 import hashlib
 import logging
-from typing import Any, Optional, Dict, Tuple
+import itertools
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 
 from src.config.constants import APIConstants, LogConstants
@@ -19,37 +23,38 @@ class MemoryCache:
     def __init__(self, max_size: int = APIConstants.MAX_CACHE_SIZE):
         """Initialize memory cache."""
         self.max_size = max_size
-        self.cache: Dict[str, Tuple[Any, float]] = {}  # key -> (value, expiry_time)
-        self._access_times: Dict[str, float] = {}  # For LRU eviction
+        # key -> (value, expiry_time), ordered from least to most recently used
+        self.cache: "OrderedDict[Any, Tuple[Any, float]]" = OrderedDict()
+        # (expiry_time, seq, key) min-heap; entries for overwritten keys go stale and
+        # are skipped until _compact_heap rebuilds it.
+        # seq breaks expiry ties so keys of different types are never compared.
+        self._expiry_heap: List[Tuple[float, int, Any]] = []
+        self._seq = itertools.count()
     
     def _generate_key(self, *args, **kwargs) -> str:
         """Generate cache key from arguments."""
-        key_data = f"{args}{sorted(kwargs.items())}"
-        return hashlib.md5(key_data.encode()).hexdigest()
+        key_data = repr((args, tuple(sorted(kwargs.items()))))
+        return hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest()
     
-    def _is_expired(self, expiry_time: float) -> bool:
+    def _is_expired(self, expiry_time: float, now: Optional[float] = None) -> bool:
         """Check if cache entry is expired."""
-        return time.time() > expiry_time
-    
-    def _evict_expired(self) -> None:
-        """Remove expired entries."""
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, expiry) in self.cache.items()
-            if current_time > expiry
-        ]
+        return (time.monotonic() if now is None else now) > expiry_time
+    
+    def _evict_expired(self, now: Optional[float] = None) -> None:
+        """Remove expired entries by popping due heads off the expiry heap."""
+        current_time = time.monotonic() if now is None else now
+        heap = self._expiry_heap
         
-        for key in expired_keys:
-            self.cache.pop(key, None)
-            self._access_times.pop(key, None)
+        while heap and heap[0][0] < current_time:
+            expiry, _, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            if entry is not None and entry[1] == expiry:
+                del self.cache[key]
     
     def _evict_lru(self) -> None:
-        """Remove least recently used entries if cache is full."""
-        while len(self.cache) >= self.max_size:
-            # Find least recently used key
-            lru_key = min(self._access_times.keys(), key=lambda k: self._access_times[k])
-            self.cache.pop(lru_key, None)
-            self._access_times.pop(lru_key, None)
+        """Remove least recently used entries if cache is over capacity."""
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
@@ -60,44 +65,164 @@ class MemoryCache:
         value, expiry_time = self.cache[key]
         
         if self._is_expired(expiry_time):
-            self.cache.pop(key, None)
-            self._access_times.pop(key, None)
+            del self.cache[key]
             logger.debug(LogConstants.CACHE_MISS.format(key=key))
             return None
         
-        # Update access time for LRU
-        self._access_times[key] = time.time()
+        # Mark as most recently used
+        self.cache.move_to_end(key)
         logger.debug(LogConstants.CACHE_HIT.format(key=key))
         return value
     
     def set(self, key: str, value: Any, ttl: int = APIConstants.CACHE_TTL_SECONDS) -> None:
         """Set value in cache with TTL."""
+        now = time.monotonic()
+        
         # Clean up expired entries
-        self._evict_expired()
+        self._evict_expired(now)
+        
+        expiry_time = now + ttl
+        self.cache[key] = (value, expiry_time)
+        self.cache.move_to_end(key)
+        heapq.heappush(self._expiry_heap, (expiry_time, next(self._seq), key))
         
         # Evict LRU entries if needed
         self._evict_lru()
-        
-        expiry_time = time.time() + ttl
-        self.cache[key] = (value, expiry_time)
-        self._access_times[key] = time.time()
+        self._compact_heap()
         
         logger.debug(f"Cached value for key: {key} (TTL: {ttl}s)")
     
+    def _compact_heap(self) -> None:
+        """Rebuild the expiry heap once stale entries outnumber live ones.
+        
+        Overwrites, deletes and LRU evictions leave their old heap entries
+        behind; rebuilding at twice the live size keeps the heap bounded
+        at amortised O(1) cost per operation.
+        """
+        if len(self._expiry_heap) <= 2 * len(self.cache):
+            return
+        
+        self._expiry_heap = [
+            (expiry_time, next(self._seq), key)
+            for key, (_, expiry_time) in self.cache.items()
+        ]
+        heapq.heapify(self._expiry_heap)
+    
     def delete(self, key: str) -> None:
         """Delete key from cache."""
         self.cache.pop(key, None)
-        self._access_times.pop(key, None)
+        self._compact_heap()
+    
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every string key starting with prefix; returns how many went."""
+        keys = [key for key in self.cache if isinstance(key, str) and key.startswith(prefix)]
+        for key in keys:
+            del self.cache[key]
+        self._compact_heap()
+        return len(keys)
     
     def clear(self) -> None:
         """Clear all cache entries."""
         self.cache.clear()
-        self._access_times.clear()
+        self._expiry_heap.clear()
         logger.info("Cache cleared")
     
     def stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
-        current_time = time.time()
+        current_time = time.monotonic()
+        active_entries = sum(
+            1 for _, expiry in self.cache.values()
+            if current_time <= expiry
+        )
+        
+        return {
+            "total_entries": len(self.cache),
+            "active_entries": active_entries,
+            "max_size": self.max_size,
+            "utilization": len(self.cache) / self.max_size if self.max_size > 0 else 0
+        }
+
+
+class CounterCache:
+    """In-memory cache with TTL that evicts the least frequently used entry.
+    
+    Hits only bump a counter, so there is no reordering on the read path,
+    and repeatedly requested entries survive scans of one-off keys.
+    """
+    
+    # Counts are halved once any reaches this, so old popularity decays
+    MAX_COUNT = 2 ** 16
+    
+    def __init__(self, max_size: int = APIConstants.MAX_CACHE_SIZE):
+        """Initialize counter cache."""
+        self.max_size = max_size
+        # key -> (value, expiry_time)
+        self.cache: Dict[Any, Tuple[Any, float]] = {}
+        self.counts: Dict[Any, int] = {}
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Get value from cache."""
+        entry = self.cache.get(key)
+        if entry is None:
+            logger.debug(LogConstants.CACHE_MISS.format(key=key))
+            return None
+        
+        value, expiry_time = entry
+        if time.monotonic() > expiry_time:
+            self.delete(key)
+            logger.debug(LogConstants.CACHE_MISS.format(key=key))
+            return None
+        
+        count = self.counts[key] + 1
+        self.counts[key] = count
+        if count >= self.MAX_COUNT:
+            self._age()
+        
+        logger.debug(LogConstants.CACHE_HIT.format(key=key))
+        return value
+    
+    def set(self, key: Any, value: Any, ttl: int = APIConstants.CACHE_TTL_SECONDS) -> None:
+        """Set value in cache with TTL."""
+        now = time.monotonic()
+        if key not in self.cache and len(self.cache) >= self.max_size:
+            self._evict(now)
+        
+        self.cache[key] = (value, now + ttl)
+        # The insert counts as a use, so a new entry outranks never-read ones
+        self.counts.setdefault(key, 1)
+        
+        logger.debug(f"Cached value for key: {key} (TTL: {ttl}s)")
+    
+    def _evict(self, now: float) -> None:
+        """Remove expired entries, or failing that the least frequently used one."""
+        expired = [key for key, (_, expiry) in self.cache.items() if now > expiry]
+        if expired:
+            for key in expired:
+                self.delete(key)
+            return
+        
+        # min() keeps the first minimum, so ties evict the oldest insertion
+        victim = min(self.counts, key=self.counts.__getitem__)
+        self.delete(victim)
+    
+    def _age(self) -> None:
+        """Halve every count."""
+        for key, count in self.counts.items():
+            self.counts[key] = count >> 1
+    
+    def delete(self, key: Any) -> None:
+        """Delete key from cache."""
+        self.cache.pop(key, None)
+        self.counts.pop(key, None)
+    
+    def clear(self) -> None:
+        """Clear all cache entries."""
+        self.cache.clear()
+        self.counts.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        current_time = time.monotonic()
         active_entries = sum(
             1 for _, expiry in self.cache.values()
             if current_time <= expiry
@@ -111,39 +236,79 @@ class MemoryCache:
         }
 
 
-# Global cache instance
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task."""
+    
+    def __init__(self):
+        """Initialize in-flight registry."""
+        self._inflight: Dict[Any, asyncio.Future] = {}
+    
+    async def do(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the running call for key, or start one with factory."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shield so one cancelled caller does not cancel the fetch for the rest
+        return await asyncio.shield(future)
+
+
+# Global cache instances; AI responses are reused by popularity rather than recency
 _cache = MemoryCache()
+_ai_cache = CounterCache()
 
 
 def cache_result(ttl: int = APIConstants.CACHE_TTL_SECONDS, key_prefix: str = ""):
-    """Decorator to cache function results."""
+    """Decorator to cache function results.
+    
+    Concurrent misses for the same arguments share a single call.
+    """
     def decorator(func):
+        flight = SingleFlight()
+        
+        async def load(cache_key: Any, args: tuple, kwargs: dict) -> Any:
+            result = await func(*args, **kwargs)
+            _cache.set(cache_key, result, ttl)
+            return result
+        
         async def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = f"{key_prefix}:{func.__name__}:{_cache._generate_key(*args, **kwargs)}"
+            # Hashable arguments key the cache directly; others fall back to a digest.
+            # Types sit next to values since 1, 1.0 and True are equal and hash alike.
+            cache_key = (
+                key_prefix,
+                func.__name__,
+                tuple((type(arg), arg) for arg in args),
+                tuple((name, type(value), value) for name, value in sorted(kwargs.items())),
+            )
+            try:
+                hash(cache_key)
+            except TypeError:
+                cache_key = (key_prefix, func.__name__, _cache._generate_key(*args, **kwargs))
             
             # Try to get from cache
             cached_result = _cache.get(cache_key)
             if cached_result is not None:
                 return cached_result
             
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            _cache.set(cache_key, result, ttl)
-            
-            return result
+            # Execute function (or join the in-flight call) and cache result
+            return await flight.do(cache_key, lambda: load(cache_key, args, kwargs))
         return wrapper
     return decorator
 
 
 def get_cache_stats() -> Dict[str, Any]:
     """Get global cache statistics."""
-    return _cache.stats()
+    stats = _cache.stats()
+    stats["ai"] = _ai_cache.stats()
+    return stats
 
 
 def clear_cache() -> None:
-    """Clear global cache."""
+    """Clear global caches."""
     _cache.clear()
+    _ai_cache.clear()
 
 
 def cached_email_messages(email_address: str, ttl: int = 60) -> Optional[Any]:
@@ -158,6 +323,12 @@ def cache_email_messages(email_address: str, messages: Any, ttl: int = 60) -> No
     _cache.set(key, messages, ttl)
 
 
+def invalidate_email_messages(email_address: str) -> None:
+    """Drop cached email messages."""
+    key = f"messages:{email_address}"
+    _cache.delete(key)
+
+
 def cached_email_content(email_address: str, message_id: str, ttl: int = 300) -> Optional[Any]:
     """Get cached email content."""
     key = f"content:{email_address}:{message_id}"
@@ -170,18 +341,28 @@ def cache_email_content(email_address: str, message_id: str, content: Any, ttl:
     _cache.set(key, content, ttl)
 
 
+def invalidate_email_content(email_address: str, message_id: str) -> None:
+    """Drop cached email content."""
+    key = f"content:{email_address}:{message_id}"
+    _cache.delete(key)
+
+def invalidate_all_email_content(email_address: str) -> None:
+    """Drop cached content, including not-found markers, for every message of an address."""
+    _cache.delete_prefix(f"content:{email_address}:")
+
+
 def cached_ai_response(content_hash: str, operation: str, ttl: int = 1800) -> Optional[Any]:
     """Get cached AI response."""
     key = f"ai:{operation}:{content_hash}"
-    return _cache.get(key)
+    return _ai_cache.get(key)
 
 
 def cache_ai_response(content_hash: str, operation: str, response: Any, ttl: int = 1800) -> None:
     """Cache AI response."""
     key = f"ai:{operation}:{content_hash}"
-    _cache.set(key, response, ttl)
+    _ai_cache.set(key, response, ttl)
 
 
 def generate_content_hash(content: str) -> str:
     """Generate hash for content caching."""
-    return hashlib.sha256(content.encode()).hexdigest()[:16]
\ No newline at end of file
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
\ No newline at end of file
@@ -2,71 +2,95 @@
 Email utility functions
 """
 
-import random
+import re
+import html
+import secrets
 import string
+import sys
+from collections import namedtuple
+from functools import lru_cache
 from typing import List, Dict, Any
 from datetime import datetime
 
 from aiogram.utils.markdown import hcode, hbold
 
+from src.config.constants import EmailConstants
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # Fall back to regex tag stripping
+    HTMLParser = None
+
+USERNAME_ALPHABET = string.ascii_lowercase + string.digits
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 
 def generate_random_email(domain: str = "mailsac.com") -> str:
     """Generate a random email address."""
-    # Generate random username with mix of letters and numbers
-    username_length = random.randint(8, 12)
-    username = ''.join(
-        random.choices(
-            string.ascii_lowercase + string.digits, 
-            k=username_length
-        )
-    )
+    # 8-12 random lowercase letters and digits from the OS CSPRNG; anyone who
+    # guesses a public Mailsac address can read it, so keep the full alphabet
+    username_length = 8 + secrets.randbelow(5)
+    username = ''.join(secrets.choice(USERNAME_ALPHABET) for _ in range(username_length))
     
     return f"{username}@{domain}"
 
 
-def format_email_list(messages: List[Dict[str, Any]], max_messages: int = 10) -> str:
-    """Format list of email messages for display."""
-    if not messages:
-        return "📭 No messages found"
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts a trailing 'Z' natively
+    _parse_timestamp = datetime.fromisoformat
+else:
+    def _parse_timestamp(timestamp: str) -> datetime:
+        """Parse an ISO timestamp, rewriting Mailsac's trailing 'Z'."""
+        if timestamp.endswith('Z'):
+            timestamp = timestamp[:-1] + '+00:00'
+        return datetime.fromisoformat(timestamp)
+
+
+EmailRow = namedtuple('EmailRow', 'id sender subject received')
+
+
+def _to_row(msg: Any) -> EmailRow:
+    """Destructure an EmailMessage or raw dict into a display row once."""
+    if isinstance(msg, dict):
+        return EmailRow(
+            msg.get('id', 'N/A'),
+            msg.get('from_address', 'Unknown'),
+            msg.get('subject', 'No Subject'),
+            msg.get('received')
+        )
+    return EmailRow(msg.id, msg.from_address, msg.subject, msg.received)
+
+
+def _format_row(index: int, row: EmailRow) -> str:
+    """Render one inbox entry."""
+    msg_id, sender, subject, received = row
     
-    formatted_messages = []
+    # Truncate long subjects and sender addresses
+    if len(subject) > 40:
+        subject = subject[:37] + "..."
+    if len(sender) > 30:
+        sender = sender[:27] + "..."
     
-    for i, msg in enumerate(messages[:max_messages]):
-        # Extract message details
-        msg_id = msg.get('id', 'N/A')[:8]
-        sender = msg.get('from_address', 'Unknown')
-        subject = msg.get('subject', 'No Subject')
-        received = msg.get('received', datetime.now())
-        
-        # Truncate long subjects
-        if len(subject) > 40:
-            subject = subject[:37] + "..."
-        
-        # Truncate long sender addresses
-        if len(sender) > 30:
-            sender = sender[:27] + "..."
-        
-        # Format timestamp
-        if isinstance(received, datetime):
-            time_str = received.strftime("%m/%d %H:%M")
-        else:
-            time_str = "Unknown"
-        
-        # Create formatted message entry
-        formatted_msg = f"""
-{hbold(f'{i+1}.')} {hcode(msg_id)}
-📨 {sender}
-📝 {subject}
-🕐 {time_str}
-        """
-        formatted_messages.append(formatted_msg.strip())
+    time_str = received.strftime("%m/%d %H:%M") if isinstance(received, datetime) else "Unknown"
     
-    result = "\n\n".join(formatted_messages)
+    return f"{hbold(f'{index}.')} {hcode(msg_id[:8])}\n📨 {sender}\n📝 {subject}\n🕐 {time_str}"
+
+
+def format_email_list(messages: List[Any], max_messages: int = 10) -> str:
+    """Format list of email messages (models or dicts) for display."""
+    if not messages:
+        return "📭 No messages found"
+    
+    listing = "\n\n".join(
+        _format_row(i, row)
+        for i, row in enumerate(map(_to_row, messages[:max_messages]), 1)
+    )
     
     if len(messages) > max_messages:
-        result += f"\n\n... and {len(messages) - max_messages} more messages"
+        return f"{listing}\n\n... and {len(messages) - max_messages} more messages"
     
-    return result
+    return listing
 
 
 def format_email_content(message: Dict[str, Any]) -> str:
@@ -103,49 +127,44 @@ def extract_plain_text(html_content: str) -> str:
     if not html_content:
         return "No content available"
     
-    # Simple HTML tag removal (in production, use proper HTML parser)
-    import re
-    
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', html_content)
-    
-    # Decode common HTML entities
-    html_entities = {
-        '&amp;': '&',
-        '&lt;': '<',
-        '&gt;': '>',
-        '&quot;': '"',
-        '&#39;': "'",
-        '&nbsp;': ' '
-    }
-    
-    for entity, char in html_entities.items():
-        text = text.replace(entity, char)
-    
-    # Clean up whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
+    # Plain-text bodies (OTP codes, notifications) skip tag stripping
+    if '<' not in html_content:
+        text = html.unescape(html_content)
+    elif HTMLParser is not None:
+        # C parser; drops script/style bodies and decodes entities itself
+        tree = HTMLParser(html_content)
+        tree.strip_tags(['script', 'style'])
+        text = tree.text(separator=' ')
+    else:
+        text = html.unescape(HTML_TAG_PATTERN.sub('', html_content))
     
-    return text or "No readable content"
+    # Collapse whitespace; str.split also drops leading and trailing runs
+    return ' '.join(text.split()) or "No readable content"
 
 
 def validate_email_address(email: str) -> bool:
     """Validate email address format."""
-    import re
-    
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    # Cheap shape checks reject most bad input before the regex runs
+    at = email.find('@')
+    if at <= 0 or len(email) > EmailConstants.MAX_EMAIL_LENGTH or '@' in email[at + 1:]:
+        return False
+    return bool(EMAIL_PATTERN.match(email))
+
+
+@lru_cache(maxsize=4096)
+def _format_iso_timestamp(timestamp: str) -> str:
+    """Format an ISO timestamp string; inbox re-renders repeat the same ones."""
+    try:
+        return _parse_timestamp(timestamp).strftime("%m/%d %H:%M")
+    except ValueError:
+        return "Unknown"
 
 
 def format_timestamp(timestamp: Any) -> str:
     """Format timestamp for display."""
     if isinstance(timestamp, str):
-        try:
-            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            return dt.strftime("%m/%d %H:%M")
-        except (ValueError, AttributeError):
-            return "Unknown"
+        return _format_iso_timestamp(timestamp)
     elif isinstance(timestamp, datetime):
         return timestamp.strftime("%m/%d %H:%M")
     else:
-        return "Unknown"
\ No newline at end of file
+        return "Unknown"
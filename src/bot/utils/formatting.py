@@ -0,0 +1,32 @@
+"""
+Message formatting utilities
+"""
+
+import re
+from typing import Any, Dict, List
+
+from aiogram.utils.formatting import Bold, Code, Text
+
+# **bold** and `code` spans, the only Markdown used in BotMessages
+MARKDOWN_PATTERN = re.compile(r'\*\*(.+?)\*\*|`([^`]+)`')
+
+
+def markdown_to_kwargs(text: str) -> Dict[str, Any]:
+    """Convert Markdown text into send kwargs carrying explicit entities.
+
+    Meant to run once at import for static messages: the result has
+    parse_mode=None, so neither aiogram nor Telegram parses it again per send.
+    """
+    text = text.strip()
+    parts: List[Any] = []
+    position = 0
+
+    for match in MARKDOWN_PATTERN.finditer(text):
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        bold, code = match.groups()
+        parts.append(Bold(bold) if bold is not None else Code(code))
+        position = match.end()
+
+    parts.append(text[position:])
+    return Text(*parts).as_kwargs()
@@ -3,9 +3,11 @@ Rate limiting utilities for API protection
 """
 
 import time
+import bisect
 import logging
+from array import array
 from typing import Dict, Tuple, Optional
-from collections import defaultdict, deque
+from collections import OrderedDict
 
 from src.config.constants import APIConstants, SecurityConstants
 from src.config.exceptions import RateLimitError
@@ -13,6 +15,13 @@ from src.config.exceptions import RateLimitError
 logger = logging.getLogger(__name__)
 
 
+def _to_wall_clock(monotonic_time: float) -> int:
+    """Convert a monotonic timestamp to epoch seconds for reporting (0 stays 0)."""
+    if not monotonic_time:
+        return 0
+    return int(time.time() + monotonic_time - time.monotonic())
+
+
 class TokenBucket:
     """Token bucket rate limiter implementation."""
     
@@ -26,27 +35,29 @@ class TokenBucket:
         self.capacity = capacity
         self.refill_rate = refill_rate
         self.tokens = capacity
-        self.last_refill = time.time()
+        self.last_refill = time.monotonic()
     
-    def _refill(self) -> None:
+    def _refill(self, now: Optional[float] = None) -> None:
         """Refill tokens based on elapsed time."""
-        now = time.time()
+        if now is None:
+            now = time.monotonic()
         elapsed = now - self.last_refill
         
         tokens_to_add = elapsed * self.refill_rate
         self.tokens = min(self.capacity, self.tokens + tokens_to_add)
         self.last_refill = now
     
-    def consume(self, tokens: int = 1) -> bool:
+    def consume(self, tokens: int = 1, now: Optional[float] = None) -> bool:
         """Try to consume tokens.
         
         Args:
             tokens: Number of tokens to consume
+            now: Monotonic timestamp, if the caller already has one
             
         Returns:
             True if tokens were consumed, False otherwise
         """
-        self._refill()
+        self._refill(now)
         
         if self.tokens >= tokens:
             self.tokens -= tokens
@@ -59,9 +70,9 @@ class TokenBucket:
         self._refill()
         return int(self.tokens)
     
-    def time_until_available(self, tokens: int = 1) -> float:
+    def time_until_available(self, tokens: int = 1, now: Optional[float] = None) -> float:
         """Get time until specified tokens are available."""
-        self._refill()
+        self._refill(now)
         
         if self.tokens >= tokens:
             return 0.0
@@ -73,21 +84,47 @@ class TokenBucket:
 class SlidingWindowRateLimiter:
     """Sliding window rate limiter."""
     
-    def __init__(self, max_requests: int, window_seconds: int):
+    def __init__(
+        self, 
+        max_requests: int, 
+        window_seconds: int, 
+        max_keys: int = SecurityConstants.MAX_TRACKED_USERS
+    ):
         """Initialize sliding window rate limiter."""
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, deque] = defaultdict(deque)
+        self.max_keys = max_keys
+        # Bounded LRU of key -> sorted request times
+        self.requests: "OrderedDict[str, array]" = OrderedDict()
+    
+    def _prune(self, request_times: array, window_start: float) -> None:
+        """Drop timestamps older than the window in one slice deletion."""
+        cut = bisect.bisect_left(request_times, window_start)
+        if cut:
+            del request_times[:cut]
+    
+    def _track(self, key: str, now: float) -> None:
+        """Start tracking key with its first request, evicting the least recent key when full."""
+        if len(self.requests) >= self.max_keys:
+            self.requests.popitem(last=False)
+        self.requests[key] = array('d', (now,))
     
-    def is_allowed(self, key: str) -> bool:
+    def is_allowed(self, key: str, now: Optional[float] = None) -> bool:
         """Check if request is allowed."""
-        now = time.time()
-        window_start = now - self.window_seconds
+        if now is None:
+            now = time.monotonic()
+        
+        request_times = self.requests.get(key)
+        if request_times is None:
+            # Unknown keys only get an entry once a request is actually admitted
+            if self.max_requests <= 0:
+                return False
+            self._track(key, now)
+            return True
         
         # Clean old requests
-        request_times = self.requests[key]
-        while request_times and request_times[0] < window_start:
-            request_times.popleft()
+        self.requests.move_to_end(key)
+        self._prune(request_times, now - self.window_seconds)
         
         # Check if under limit
         if len(request_times) < self.max_requests:
@@ -96,21 +133,23 @@ class SlidingWindowRateLimiter:
         
         return False
     
-    def get_remaining_requests(self, key: str) -> int:
+    def get_remaining_requests(self, key: str, now: Optional[float] = None) -> int:
         """Get remaining requests in window."""
-        now = time.time()
+        if now is None:
+            now = time.monotonic()
         window_start = now - self.window_seconds
         
         # Clean old requests
-        request_times = self.requests[key]
-        while request_times and request_times[0] < window_start:
-            request_times.popleft()
+        request_times = self.requests.get(key)
+        if request_times is None:
+            return self.max_requests
+        self._prune(request_times, window_start)
         
         return max(0, self.max_requests - len(request_times))
     
     def get_reset_time(self, key: str) -> float:
-        """Get time when window resets."""
-        request_times = self.requests[key]
+        """Get monotonic time when window resets."""
+        request_times = self.requests.get(key)
         if not request_times:
             return 0.0
         
@@ -122,12 +161,6 @@ class RateLimiter:
     
     def __init__(self):
         """Initialize rate limiter."""
-        # User rate limiting (per minute)
-        self.user_limiter = SlidingWindowRateLimiter(
-            max_requests=SecurityConstants.USER_RATE_LIMIT,
-            window_seconds=60
-        )
-        
         # Global rate limiting (per minute)
         self.global_limiter = SlidingWindowRateLimiter(
             max_requests=SecurityConstants.GLOBAL_RATE_LIMIT,
@@ -140,74 +173,95 @@ class RateLimiter:
             window_seconds=60
         )
         
-        # Token buckets for burst protection
-        self.user_buckets: Dict[str, TokenBucket] = {}
+        # Per-user token buckets (burst + sustained rate), bounded LRU by user
+        self.user_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        
+        # Last call per (user, service) for the cheap minimum-gap check
+        self.last_calls: Dict[Tuple[str, Optional[str]], float] = {}
+        self._last_prune = time.monotonic()
     
     def _get_user_bucket(self, user_id: str) -> TokenBucket:
         """Get or create token bucket for user."""
-        if user_id not in self.user_buckets:
-            self.user_buckets[user_id] = TokenBucket(
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            if len(self.user_buckets) >= SecurityConstants.MAX_TRACKED_USERS:
+                self.user_buckets.popitem(last=False)
+            bucket = self.user_buckets[user_id] = TokenBucket(
                 capacity=10,  # Allow burst of 10 requests
-                refill_rate=0.5  # Refill 0.5 tokens per second (30 per minute)
+                refill_rate=SecurityConstants.USER_RATE_LIMIT / 60  # Sustained per-minute limit
             )
-        return self.user_buckets[user_id]
+        else:
+            self.user_buckets.move_to_end(user_id)
+        return bucket
     
-    def check_user_rate_limit(self, user_id: str) -> None:
-        """Check user rate limit."""
-        user_key = f"user:{user_id}"
+    def check_min_gap(
+        self, 
+        user_id: str, 
+        service: Optional[str] = None, 
+        now: Optional[float] = None
+    ) -> None:
+        """Reject back-to-back calls before the heavier window checks."""
+        if now is None:
+            now = time.monotonic()
+        key = (user_id, service)
         
-        # Check sliding window
-        if not self.user_limiter.is_allowed(user_key):
-            reset_time = self.user_limiter.get_reset_time(user_key)
-            retry_after = int(reset_time - time.time())
-            
-            logger.warning(f"User {user_id} hit rate limit")
-            raise RateLimitError("user", retry_after)
+        if now - self.last_calls.get(key, 0.0) < SecurityConstants.MIN_REQUEST_GAP:
+            raise RateLimitError("burst")
+        self.last_calls[key] = now
         
-        # Check token bucket for burst protection
+        # Amortized pruning keeps the map bounded to recently active users
+        if now - self._last_prune > 60:
+            cutoff = now - 60
+            self.last_calls = {k: t for k, t in self.last_calls.items() if t > cutoff}
+            self._last_prune = now
+    
+    def check_user_rate_limit(self, user_id: str, now: Optional[float] = None) -> None:
+        """Check user rate limit."""
         bucket = self._get_user_bucket(user_id)
-        if not bucket.consume():
-            retry_after = int(bucket.time_until_available())
+        if not bucket.consume(now=now):
+            retry_after = int(bucket.time_until_available(now=now))
             
-            logger.warning(f"User {user_id} hit burst limit")
-            raise RateLimitError("burst", retry_after)
+            logger.warning(f"User {user_id} hit rate limit")
+            raise RateLimitError("user", retry_after)
     
-    def check_global_rate_limit(self) -> None:
+    def check_global_rate_limit(self, now: Optional[float] = None) -> None:
         """Check global rate limit."""
-        if not self.global_limiter.is_allowed("global"):
+        if now is None:
+            now = time.monotonic()
+        if not self.global_limiter.is_allowed("global", now):
             reset_time = self.global_limiter.get_reset_time("global")
-            retry_after = int(reset_time - time.time())
+            retry_after = int(reset_time - now)
             
             logger.warning("Global rate limit exceeded")
             raise RateLimitError("global", retry_after)
     
-    def check_api_rate_limit(self, service: str) -> None:
+    def check_api_rate_limit(self, service: str, now: Optional[float] = None) -> None:
         """Check API rate limit."""
+        if now is None:
+            now = time.monotonic()
         api_key = f"api:{service}"
         
-        if not self.api_limiter.is_allowed(api_key):
+        if not self.api_limiter.is_allowed(api_key, now):
             reset_time = self.api_limiter.get_reset_time(api_key)
-            retry_after = int(reset_time - time.time())
+            retry_after = int(reset_time - now)
             
             logger.warning(f"API rate limit exceeded for {service}")
             raise RateLimitError(f"api:{service}", retry_after)
     
     def get_user_stats(self, user_id: str) -> Dict[str, int]:
         """Get rate limit stats for user."""
-        user_key = f"user:{user_id}"
         bucket = self._get_user_bucket(user_id)
         
         return {
-            "remaining_requests": self.user_limiter.get_remaining_requests(user_key),
             "available_tokens": bucket.available_tokens(),
-            "window_reset": int(self.user_limiter.get_reset_time(user_key))
+            "retry_after": int(bucket.time_until_available())
         }
     
     def get_global_stats(self) -> Dict[str, int]:
         """Get global rate limit stats."""
         return {
             "remaining_requests": self.global_limiter.get_remaining_requests("global"),
-            "window_reset": int(self.global_limiter.get_reset_time("global"))
+            "window_reset": _to_wall_clock(self.global_limiter.get_reset_time("global"))
         }
 
 
@@ -218,15 +272,21 @@ _rate_limiter = RateLimiter()
 def check_rate_limits(user_id: str, service: Optional[str] = None) -> None:
     """Check all applicable rate limits."""
     try:
-        # Check global rate limit first
-        _rate_limiter.check_global_rate_limit()
+        now = time.monotonic()
+        user_key = str(user_id)
+        
+        # Cheap per-user burst sieve first
+        _rate_limiter.check_min_gap(user_key, service, now)
+        
+        # Check global rate limit
+        _rate_limiter.check_global_rate_limit(now)
         
         # Check user rate limit
-        _rate_limiter.check_user_rate_limit(str(user_id))
+        _rate_limiter.check_user_rate_limit(user_key, now)
         
         # Check API rate limit if service specified
         if service:
-            _rate_limiter.check_api_rate_limit(service)
+            _rate_limiter.check_api_rate_limit(service, now)
             
     except RateLimitError:
         # Re-raise rate limit errors
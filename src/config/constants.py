@@ -2,7 +2,8 @@
 Application constants and configuration values
 """
 
-from enum import Enum
+import re
+import sys
 
 
 class BotMessages:
@@ -80,6 +81,7 @@ Contact support or check our documentation for more details.
     AI_SUMMARIZING = "📝 AI is summarizing the message..."
     AI_SECURITY_CHECK = "🛡️ AI is checking email security..."
     AI_ERROR = "❌ AI service is temporarily unavailable."
+    AI_ANSWER_INCOMPLETE = "⚠️ The answer was cut off. Please try again."
 
 
 class APIConstants:
@@ -89,19 +91,73 @@ class APIConstants:
     MAX_REQUESTS_PER_MINUTE = 60
     MAX_REQUESTS_PER_HOUR = 1000
     
+    # Telegram outbound limits (Bot API: ~30 msg/s overall, ~1 msg/s per chat)
+    TELEGRAM_GLOBAL_RATE = 30
+    TELEGRAM_CHAT_RATE = 1
+    TELEGRAM_CHAT_BURST = 3
+    TELEGRAM_MAX_TRACKED_CHATS = 10000
+    
     # Timeouts (seconds)
     HTTP_TIMEOUT = 30
     API_TIMEOUT = 15
+    KEEPALIVE_TIMEOUT = 75  # Keep idle pooled connections between user commands
+    
+    # Concurrency
+    MAX_CONCURRENT_FETCHES = 10  # Parallel Mailsac body downloads
+    OFFLOAD_PARSE_MIN_MESSAGES = 50  # Larger inbox listings are validated off the event loop
     
     # Retry settings
     MAX_RETRIES = 3
     RETRY_BACKOFF = 2
+    MAX_RETRY_DELAY = 10  # seconds
+    RETRY_JITTER = 0.1  # seconds of random spread so clients don't retry in lockstep
     
     # Cache settings
     CACHE_TTL_SECONDS = 300  # 5 minutes
+    ETAG_TTL_SECONDS = 3600  # How long validators for conditional GETs are kept
     MAX_CACHE_SIZE = 1000
 
 
+class AIConstants:
+    """Gemini generation constants."""
+    
+    # Sampling settings
+    TEMPERATURE = 0.3
+    TOP_P = 0.95
+    TOP_K = 40
+    
+    # Upper bound on generated tokens per request
+    MAX_OUTPUT_TOKENS = 1024
+    
+    # Tighter output caps for short answers. Thinking models count their
+    # reasoning against the cap too, so these leave headroom over the visible reply
+    CATEGORY_MAX_TOKENS = 64
+    SECURITY_MAX_TOKENS = 1024
+    SUMMARY_MIN_TOKENS = 32
+    SUMMARY_TEMPERATURE = 0.2
+    
+    # Email bodies longer than this are cut to head + tail before prompting
+    BODY_CHAR_BUDGET = 6000
+    
+    # Batched prompts: per-email cut and total size of one batched request
+    BATCH_EMAIL_CHAR_BUDGET = 1500
+    BATCH_CHAR_BUDGET = 8000
+    
+    # Keyword prefilter: scanned prefix and hits needed to skip the model
+    PREFILTER_CHAR_BUDGET = 2048
+    PREFILTER_MIN_MATCHES = 2
+    
+    # Mailsac message IDs are immutable, so per-message summaries live longer
+    SUMMARY_CACHE_TTL = 86400
+    
+    # Streaming replies (Telegram allows roughly one edit per second per chat)
+    STREAM_EDIT_INTERVAL = 1.0
+    STREAM_EDIT_MIN_CHARS = 200
+    
+    # In-flight Gemini requests per process, to stay under the RPM quota in bursts
+    MAX_CONCURRENT_REQUESTS = 5
+
+
 class EmailConstants:
     """Email-related constants."""
     
@@ -133,7 +189,7 @@ class LogConstants:
     DETAILED_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
     
     # Log messages
-    USER_ACTION = "User {user_id} performed action: {action}"
+    USER_ACTION = "User %s performed action: %s"  # lazy %-style logger args
     API_REQUEST = "API request to {service}: {method} {endpoint}"
     API_ERROR = "API error from {service}: {status_code} - {error}"
     CACHE_HIT = "Cache hit for key: {key}"
@@ -144,30 +200,43 @@ class SecurityConstants:
     """Security-related constants."""
     
     # Input sanitization
-    ALLOWED_CHARS = r'[a-zA-Z0-9\s\-_.@]'
     MAX_INPUT_LENGTH = 1000
     
     # Rate limiting
     USER_RATE_LIMIT = 30  # requests per minute per user
     GLOBAL_RATE_LIMIT = 1000  # requests per minute globally
+    MIN_REQUEST_GAP = 0.1  # seconds between calls per user and service
+    MAX_TRACKED_USERS = 10000  # per-user limiter state kept for most recent users only
     
     # Content filtering
-    BLOCKED_PATTERNS = [
-        r'<script.*?>.*?</script>',
-        r'javascript:',
-        r'on\w+\s*=',
-        r'<iframe.*?>.*?</iframe>',
-    ]
-
-
-class StatusCode(Enum):
+    # One alternation scanned in a single pass; [^>]* keeps tag matching
+    # from backtracking across the input
+    BLOCKED_REGEX = (
+        r'<script\b[^>]*>.*?</script>'
+        r'|javascript:'
+        r'|on\w+\s*='
+        r'|<iframe\b[^>]*>.*?</iframe>'
+    )
+    BLOCKED_PATTERN = re.compile(BLOCKED_REGEX, re.IGNORECASE | re.DOTALL)
+
+
+class StatusCode:
     """HTTP status code constants."""
     OK = 200
     CREATED = 201
+    NOT_MODIFIED = 304
     BAD_REQUEST = 400
     UNAUTHORIZED = 401
     FORBIDDEN = 403
     NOT_FOUND = 404
     TOO_MANY_REQUESTS = 429
     INTERNAL_SERVER_ERROR = 500
-    SERVICE_UNAVAILABLE = 503
\ No newline at end of file
+    SERVICE_UNAVAILABLE = 503
+
+
+# Static replies are sent on every command; intern them so repeated
+# comparisons against the same text short-circuit on identity
+for _name, _value in list(vars(BotMessages).items()):
+    if isinstance(_value, str) and not _name.startswith('_'):
+        setattr(BotMessages, _name, sys.intern(_value))
+del _name, _value
@@ -3,11 +3,14 @@ Custom exception classes for better error handling
 """
 
 from typing import Optional, Dict, Any
-from enum import Enum
 
 
-class ErrorCode(Enum):
-    """Error code enumeration."""
+class ErrorCode:
+    """Error code constants.
+    
+    Plain string attributes rather than an Enum, so exceptions carry and
+    serialize the code without enum member lookups.
+    """
     
     # General errors
     UNKNOWN_ERROR = "UNKNOWN_ERROR"
@@ -41,13 +44,19 @@ class ErrorCode(Enum):
     USER_INVALID_COMMAND = "USER_INVALID_COMMAND"
 
 
+# User-facing message templates
+_API_USER_MESSAGE = "{} service is temporarily unavailable. Please try again later."
+_EMAIL_USER_MESSAGE = "Failed to {} email. Please try again."
+_AI_USER_MESSAGE = "AI service is currently unavailable. Please try again later."
+
+
 class BotException(Exception):
     """Base exception class for the bot."""
     
     def __init__(
         self,
         message: str,
-        error_code: ErrorCode = ErrorCode.UNKNOWN_ERROR,
+        error_code: str = ErrorCode.UNKNOWN_ERROR,
         user_message: Optional[str] = None,
         details: Optional[Dict[str, Any]] = None
     ):
@@ -57,15 +66,21 @@ class BotException(Exception):
         self.user_message = user_message or "An error occurred. Please try again."
         self.details = details or {}
         self.original_message = message
+        self._dict: Optional[Dict[str, Any]] = None
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert exception to dictionary."""
-        return {
-            "error_code": self.error_code.value,
-            "message": self.original_message,
-            "user_message": self.user_message,
-            "details": self.details
-        }
+        """Convert exception to dictionary.
+        
+        Built on first use and shared afterwards; treat it as read-only.
+        """
+        if self._dict is None:
+            self._dict = {
+                "error_code": self.error_code,
+                "message": self.original_message,
+                "user_message": self.user_message,
+                "details": self.details
+            }
+        return self._dict
 
 
 class ValidationError(BotException):
@@ -93,16 +108,17 @@ class APIError(BotException):
         service: str,
         status_code: Optional[int] = None,
         response_text: Optional[str] = None,
-        error_code: ErrorCode = ErrorCode.API_CONNECTION_ERROR
+        error_code: str = ErrorCode.API_CONNECTION_ERROR
     ):
         """Initialize API error."""
-        message = f"{service} API error"
+        parts = [service, " API error"]
         if status_code:
-            message += f" (status: {status_code})"
+            parts.append(f" (status: {status_code})")
         if response_text:
-            message += f": {response_text}"
+            parts.append(f": {response_text}")
+        message = "".join(parts)
         
-        user_message = f"{service} service is temporarily unavailable. Please try again later."
+        user_message = _API_USER_MESSAGE.format(service)
         details = {
             "service": service,
             "status_code": status_code,
@@ -125,16 +141,17 @@ class EmailError(BotException):
         operation: str,
         email_address: Optional[str] = None,
         reason: Optional[str] = None,
-        error_code: ErrorCode = ErrorCode.EMAIL_FETCH_FAILED
+        error_code: str = ErrorCode.EMAIL_FETCH_FAILED
     ):
         """Initialize email error."""
-        message = f"Email {operation} failed"
+        parts = ["Email ", operation, " failed"]
         if email_address:
-            message += f" for {email_address}"
+            parts.append(f" for {email_address}")
         if reason:
-            message += f": {reason}"
+            parts.append(f": {reason}")
+        message = "".join(parts)
         
-        user_message = f"Failed to {operation} email. Please try again."
+        user_message = _EMAIL_USER_MESSAGE.format(operation)
         details = {
             "operation": operation,
             "email_address": email_address,
@@ -156,14 +173,12 @@ class AIError(BotException):
         self,
         operation: str,
         reason: Optional[str] = None,
-        error_code: ErrorCode = ErrorCode.AI_SERVICE_UNAVAILABLE
+        error_code: str = ErrorCode.AI_SERVICE_UNAVAILABLE
     ):
         """Initialize AI error."""
-        message = f"AI {operation} failed"
-        if reason:
-            message += f": {reason}"
+        message = f"AI {operation} failed: {reason}" if reason else f"AI {operation} failed"
         
-        user_message = "AI service is currently unavailable. Please try again later."
+        user_message = _AI_USER_MESSAGE
         details = {
             "operation": operation,
             "reason": reason
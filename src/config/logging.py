@@ -2,37 +2,62 @@
 Logging configuration
 """
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 
-from rich.console import Console
-from rich.logging import RichHandler
-from rich.traceback import install
+from src.config.constants import LogConstants
+
+_LEVELS = {
+    name: getattr(logging, name)
+    for name in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+}
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records as-is; formatting and rendering run on the listener thread."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Skip eager formatting; records never leave the process."""
+        return record
 
 
 def setup_logging(log_level: str = "INFO", debug: bool = False) -> None:
-    """Setup application logging with Rich formatting."""
+    """Setup application logging, with Rich formatting in debug mode."""
     
-    # Install Rich traceback handler
-    install(show_locals=debug)
+    if debug:
+        # Rich (and pygments) only load when debugging
+        from rich.console import Console
+        from rich.logging import RichHandler
+        from rich.traceback import install
+        
+        # Install Rich traceback handler
+        install(show_locals=True)
+        
+        handler: logging.Handler = RichHandler(
+            console=Console(stderr=True),
+            rich_tracebacks=True,
+            tracebacks_show_locals=True,
+            markup=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter(LogConstants.STANDARD_FORMAT))
     
-    # Create console for Rich handler
-    console = Console(stderr=True)
+    # Console writes happen on a background thread, off the event loop
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
     
     # Configure root logger
     logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[
-            RichHandler(
-                console=console,
-                rich_tracebacks=True,
-                tracebacks_show_locals=debug,
-                markup=True
-            )
-        ]
+        level=_LEVELS[log_level.upper()],
+        handlers=[_DeferredQueueHandler(log_queue)]
     )
     
     # Set specific logger levels
@@ -43,7 +68,7 @@ def setup_logging(log_level: str = "INFO", debug: bool = False) -> None:
     }
     
     for logger_name, level in loggers_config.items():
-        logging.getLogger(logger_name).setLevel(getattr(logging, level))
+        logging.getLogger(logger_name).setLevel(_LEVELS[level])
     
     # Log startup message
     logger = logging.getLogger(__name__)
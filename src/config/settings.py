@@ -3,8 +3,9 @@ Application settings and configuration
 """
 
 import os
-from typing import Optional
-from pydantic import Field, validator
+from functools import lru_cache
+from typing import Literal, Optional
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
 
@@ -23,40 +24,31 @@ class Settings(BaseSettings):
     # Google Gemini Configuration
     google_ai_api_key: str = Field(..., env="GOOGLE_AI_API_KEY")
     gemini_model: str = Field("gemini-pro", env="GEMINI_MODEL")
+    gemini_fast_model: str = Field("gemini-2.0-flash", env="GEMINI_FAST_MODEL")
     
     # Bot Configuration
     debug: bool = Field(False, env="DEBUG")
-    log_level: str = Field("INFO", env="LOG_LEVEL")
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = Field("INFO", env="LOG_LEVEL")
     
     # Email Configuration
     default_email_domain: str = Field("mailsac.com", env="DEFAULT_EMAIL_DOMAIN")
-    email_retention_hours: int = Field(24, env="EMAIL_RETENTION_HOURS")
-    max_emails_per_user: int = Field(10, env="MAX_EMAILS_PER_USER")
+    email_retention_hours: int = Field(24, ge=1, le=168, env="EMAIL_RETENTION_HOURS")  # 1 hour to 1 week
+    max_emails_per_user: int = Field(10, ge=1, le=100, env="MAX_EMAILS_PER_USER")
     
-    @validator("log_level")
-    def validate_log_level(cls, v):
-        """Validate log level."""
-        valid_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-        if v.upper() not in valid_levels:
-            raise ValueError(f"Log level must be one of: {valid_levels}")
-        return v.upper()
-    
-    @validator("email_retention_hours")
-    def validate_retention_hours(cls, v):
-        """Validate email retention hours."""
-        if v < 1 or v > 168:  # 1 hour to 1 week
-            raise ValueError("Email retention must be between 1 and 168 hours")
-        return v
-    
-    @validator("max_emails_per_user")
-    def validate_max_emails(cls, v):
-        """Validate max emails per user."""
-        if v < 1 or v > 100:
-            raise ValueError("Max emails per user must be between 1 and 100")
-        return v
+    @field_validator("log_level", mode="before")
+    @classmethod
+    def normalize_log_level(cls, v):
+        """Accept log levels in any case."""
+        return v.upper() if isinstance(v, str) else v
     
     class Config:
         """Pydantic config."""
         env_file = ".env"
         env_file_encoding = "utf-8"
-        case_sensitive = False
\ No newline at end of file
+        case_sensitive = False
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings from the environment once per process."""
+    return Settings()
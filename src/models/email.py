@@ -2,9 +2,40 @@
 Email data models
 """
 
+import re
+import string
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from src.config.constants import EmailConstants
+
+# Compiled once; validators run for every message parsed from Mailsac
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Deletion tables: an address part is valid when translating it leaves nothing
+_LOCAL_PART_TABLE = str.maketrans('', '', string.ascii_letters + string.digits + '._%+-')
+_HOST_TABLE = str.maketrans('', '', string.ascii_letters + string.digits + '.-')
+
+
+def _is_plain_email(v: str) -> bool:
+    """Check EMAIL_REGEX's shape with C-level str methods instead of the regex engine.
+    
+    This decides every input on its own: the regex's last '.' must start the
+    letters-only TLD, which is exactly the rpartition split, so there is no
+    shape left to defer to the regex. It also enforces the length bound the
+    regex lacks.
+    """
+    if not 3 <= len(v) <= EmailConstants.MAX_EMAIL_LENGTH or not v.isascii():
+        return False
+    local, at, domain = v.partition('@')
+    host, dot, tld = domain.rpartition('.')
+    return bool(
+        local and host and dot
+        and len(tld) >= 2 and tld.isalpha()
+        and not local.translate(_LOCAL_PART_TABLE)
+        and not host.translate(_HOST_TABLE)
+    )
 
 
 class EmailAttachment(BaseModel):
@@ -30,26 +61,22 @@ class EmailMessage(BaseModel):
     security_level: Optional[str] = None
     summary: Optional[str] = None
     
-    @validator('from_address', 'to_address')
+    @field_validator('from_address', 'to_address')
+    @classmethod
     def validate_email_format(cls, v):
         """Validate email address format."""
-        import re
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(pattern, v):
+        if not _is_plain_email(v):
             raise ValueError(f"Invalid email format: {v}")
         return v
     
-    @validator('body')
+    @field_validator('body')
+    @classmethod
     def clean_body_content(cls, v):
         """Clean body content."""
         if v:
             # Remove excessive whitespace
-            import re
-            v = re.sub(r'\s+', ' ', v.strip())
+            v = WHITESPACE_PATTERN.sub(' ', v.strip())
         return v
     
-    class Config:
-        """Pydantic config."""
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+    # Datetimes serialize as ISO 8601 in JSON mode by default
+    model_config = ConfigDict(extra="ignore")
\ No newline at end of file
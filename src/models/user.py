@@ -2,37 +2,29 @@
 User data models and settings
 """
 
+import sys
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
-from enum import Enum
+from typing import Optional, Dict, Any, List, Literal, get_args
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 
 
-class NotificationLevel(str, Enum):
-    """Notification level options."""
-    ALL = "all"
-    IMPORTANT = "important"
-    NONE = "none"
+# Setting values are plain validated strings; pydantic-core checks
+# Literal membership without going through Enum lookups
+NotificationLevel = Literal["all", "important", "none"]
+NOTIFY_ALL = "all"
+NOTIFY_IMPORTANT = "important"
+NOTIFY_NONE = "none"
 
-
-class LanguageCode(str, Enum):
-    """Supported language codes."""
-    EN = "en"
-    ES = "es"
-    FR = "fr"
-    DE = "de"
-    IT = "it"
-    PT = "pt"
-    RU = "ru"
-    ZH = "zh"
-    JA = "ja"
-    KO = "ko"
+LanguageCode = Literal["en", "es", "fr", "de", "it", "pt", "ru", "zh", "ja", "ko"]
+SUPPORTED_LANGUAGES = get_args(LanguageCode)
+DEFAULT_LANGUAGE = "en"
 
 
 class UserSettings(BaseModel):
     """User settings and preferences."""
     # Notification settings
-    notification_level: NotificationLevel = NotificationLevel.ALL
+    notification_level: NotificationLevel = NOTIFY_ALL
     notify_new_emails: bool = True
     notify_ai_analysis: bool = True
     
@@ -41,7 +33,7 @@ class UserSettings(BaseModel):
     auto_delete_hours: int = Field(default=24, ge=1, le=168)  # 1 hour to 1 week
     
     # Language and localization
-    language: LanguageCode = LanguageCode.EN
+    language: LanguageCode = DEFAULT_LANGUAGE
     timezone: Optional[str] = None
     
     # Privacy settings
@@ -53,9 +45,12 @@ class UserSettings(BaseModel):
     ai_security_check: bool = True
     ai_auto_categorize: bool = True
     
-    class Config:
-        """Pydantic config."""
-        use_enum_values = True
+    # Frozen so one default instance can be shared by every session
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+# Most users never change settings; they all point at this instance
+DEFAULT_USER_SETTINGS = UserSettings()
 
 
 class UserSession(BaseModel):
@@ -67,41 +62,70 @@ class UserSession(BaseModel):
     
     # Current session data
     current_email: Optional[str] = None
-    active_emails: List[str] = Field(default_factory=list)
+    # Insertion-ordered set of addresses: O(1) add, remove and membership
+    active_emails: Dict[str, None] = Field(default_factory=dict)
     
     # Session tracking
     first_seen: datetime = Field(default_factory=datetime.now)
-    last_activity: datetime = Field(default_factory=datetime.now)
+    last_activity: float = Field(default_factory=time.time)  # epoch seconds
     message_count: int = 0
     
     # User settings
-    settings: UserSettings = Field(default_factory=UserSettings)
+    settings: UserSettings = Field(default_factory=lambda: DEFAULT_USER_SETTINGS)
     
     def update_activity(self) -> None:
         """Update last activity timestamp."""
-        self.last_activity = datetime.now()
+        self.last_activity = time.time()
         self.message_count += 1
     
+    @property
+    def last_activity_dt(self) -> datetime:
+        """Last activity as a local datetime, for display."""
+        return datetime.fromtimestamp(self.last_activity)
+    
     def add_email(self, email_address: str) -> None:
-        """Add email to active emails list."""
-        if email_address not in self.active_emails:
-            self.active_emails.append(email_address)
+        """Add email to active emails."""
+        self.active_emails[email_address] = None
         self.current_email = email_address
     
     def remove_email(self, email_address: str) -> None:
-        """Remove email from active emails list."""
-        if email_address in self.active_emails:
-            self.active_emails.remove(email_address)
+        """Remove email from active emails."""
+        self.active_emails.pop(email_address, None)
         
         # Update current email if removed
         if self.current_email == email_address:
-            self.current_email = self.active_emails[0] if self.active_emails else None
-    
-    class Config:
-        """Pydantic config."""
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+            self.current_email = next(iter(self.active_emails), None)
+    
+    def update_settings(self, **changes: Any) -> UserSettings:
+        """Replace settings with a validated copy carrying the given changes."""
+        self.settings = UserSettings.model_validate({**self.settings.model_dump(), **changes})
+        return self.settings
+    
+    @field_validator('active_emails', mode='before')
+    @classmethod
+    def accept_email_list(cls, v):
+        """Accept the list form active_emails is serialized as."""
+        if isinstance(v, (list, tuple)):
+            return dict.fromkeys(v)
+        return v
+    
+    @field_serializer('active_emails')
+    def serialize_active_emails(self, active_emails: Dict[str, None]) -> List[str]:
+        """Serialize active emails as a list, as before."""
+        return list(active_emails)
+    
+    # Datetimes serialize as ISO 8601 in JSON mode by default
+    model_config = ConfigDict(extra="ignore")
+
+
+# Bot commands interned once, so per-user counters share key objects
+_COMMAND_KEYS = {
+    command: sys.intern(command)
+    for command in (
+        "/start", "/help", "/new_email", "/inbox", "/read",
+        "/summarize", "/ask", "/settings",
+    )
+}
 
 
 class UserStatistics(BaseModel):
@@ -126,21 +150,24 @@ class UserStatistics(BaseModel):
     
     # Timestamps
     first_use: datetime = Field(default_factory=datetime.now)
-    last_updated: datetime = Field(default_factory=datetime.now)
+    last_updated: float = Field(default_factory=time.time)  # epoch seconds
     
     def increment_counter(self, counter_name: str, amount: int = 1) -> None:
         """Increment a statistics counter."""
         if hasattr(self, counter_name):
             setattr(self, counter_name, getattr(self, counter_name) + amount)
-        self.last_updated = datetime.now()
+        self.last_updated = time.time()
     
     def increment_command(self, command: str) -> None:
         """Increment command usage counter."""
-        self.commands_used[command] = self.commands_used.get(command, 0) + 1
-        self.last_updated = datetime.now()
-    
-    class Config:
-        """Pydantic config."""
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+        key = _COMMAND_KEYS.get(command) or sys.intern(command)
+        self.commands_used[key] = self.commands_used.get(key, 0) + 1
+        self.last_updated = time.time()
+    
+    @property
+    def last_updated_dt(self) -> datetime:
+        """Last update as a local datetime, for display."""
+        return datetime.fromtimestamp(self.last_updated)
+    
+    # Datetimes serialize as ISO 8601 in JSON mode by default
+    model_config = ConfigDict(extra="ignore")
\ No newline at end of file
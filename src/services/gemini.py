@@ -2,12 +2,110 @@
 Google Gemini AI service integration
 """
 
+import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+import re
+from functools import lru_cache
+from typing import AsyncGenerator, Optional, List, Dict, Any
 from enum import Enum
 
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from pydantic import BaseModel, Field
+
+from src.config.constants import AIConstants
+from src.config.exceptions import AIError
+from src.bot.utils.cache import (
+    cached_ai_response,
+    cache_ai_response,
+    generate_content_hash
+)
+
+# Prompt templates, kept compact to minimise input tokens
+SUMMARY_PROMPT = (
+    "Summarize this email in {max_length} characters or less. "
+    "Focus on the main points, key information and any action items.\n\n"
+    "Email:\n{content}"
+)
+
+ANSWER_PROMPT = (
+    "Answer the question using only this email. "
+    "If the email does not contain the answer, say so clearly.\n\n"
+    "Email:\n{content}\n\n"
+    "Question: {question}"
+)
+
+CATEGORY_PROMPT = (
+    "Category (one word: spam|promotional|personal|business|verification|"
+    "newsletter|security|unknown) for this email:\n{content}"
+)
+
+BATCH_CATEGORY_PROMPT = (
+    "Categorize each of the following {count} emails as one of: spam, promotional, "
+    "personal, business, verification, newsletter, security, unknown.\n"
+    "Respond with one line per email in the form '<number>: <category>', "
+    "using the lowercase category name.\n\n"
+    "{emails}"
+)
+
+# "<number>: <category>" lines in batched answers
+BATCH_LINE_PATTERN = re.compile(r'^\s*(\d+)\s*[:.)]\s*([a-z]+)', re.MULTILINE)
+
+# Structured prompts: the field layout comes from the response schema
+SECURITY_PROMPT = (
+    "Assess this email for security threats and spam or phishing indicators, "
+    "with a 0-100 confidence and safety recommendations.\n\n"
+    "Email:\n{content}"
+)
+
+TRANSLATE_PROMPT = (
+    "Translate this email to {target_language}, keeping the original "
+    "formatting and tone.\n\n"
+    "Email:\n{content}"
+)
+
+ANALYSIS_PROMPT = (
+    "Analyze this email: summarize it in {max_length} characters or less, "
+    "categorize it and assess it for security threats.\n\n"
+    "Email:\n{content}"
+)
+
+EXTRACT_PROMPT = (
+    "Extract the key information from this email.\n\n"
+    "Email:\n{content}"
+)
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": AIConstants.TEMPERATURE,
+    "top_p": AIConstants.TOP_P,
+    "top_k": AIConstants.TOP_K,
+    "max_output_tokens": AIConstants.MAX_OUTPUT_TOKENS,
+}
+
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+}
+
+
+def truncate_body(content: str, budget: int = AIConstants.BODY_CHAR_BUDGET) -> str:
+    """Keep the head and tail of an oversized email body within budget."""
+    if len(content) <= budget:
+        return content
+    return content[:budget * 2 // 3] + "\n…[truncated]…\n" + content[-(budget // 3):]
+
+
+@lru_cache(maxsize=None)
+def get_model(api_key: str, model_name: str) -> genai.GenerativeModel:
+    """Configure the SDK and build a model once per process.
+    
+    genai.configure mutates global SDK state, so it must not run again
+    for every service instance.
+    """
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name=model_name, safety_settings=SAFETY_SETTINGS)
 
 
 class EmailCategory(Enum):
@@ -30,61 +128,230 @@ class SecurityLevel(Enum):
     UNKNOWN = "unknown"
 
 
+# Value -> member lookups, avoiding Enum construction and ValueError on misses
+CATEGORY_BY_NAME = {category.value: category for category in EmailCategory}
+
+
+# Cheap keyword signals for common categories, checked before calling the model
+PREFILTER_PATTERNS = (
+    (EmailCategory.VERIFICATION, re.compile(r'verif(?:y|ication)|one[- ]?time|\botp\b', re.I)),
+    (EmailCategory.NEWSLETTER, re.compile(r'unsubscribe|newsletter|mailing list', re.I)),
+    (EmailCategory.PROMOTIONAL, re.compile(r'% off|\bsale\b|discount|coupon', re.I)),
+)
+
+# Phishing phrasing always goes to the model so spam and security categories
+# are not missed. Links alone are no signal (every newsletter has an
+# unsubscribe link), only links next to login or account-action wording are.
+PREFILTER_CREDENTIAL_PATTERN = re.compile(
+    r'passw(?:or)?d|passcode|credential|card number|social security|bank (?:account|details)',
+    re.I
+)
+PREFILTER_LOGIN_PATTERN = re.compile(
+    r'log ?in|sign[- ]?in|verify your account|update your (?:account|payment)',
+    re.I
+)
+PREFILTER_LINK_PATTERN = re.compile(r'https?://|www\.', re.I)
+
+
+def prefilter_category(content: str) -> Optional[EmailCategory]:
+    """Return the category when exactly one keyword group clearly matches."""
+    head = content[:AIConstants.PREFILTER_CHAR_BUDGET]
+    if PREFILTER_CREDENTIAL_PATTERN.search(head) or (
+        PREFILTER_LOGIN_PATTERN.search(head) and PREFILTER_LINK_PATTERN.search(head)
+    ):
+        return None
+    
+    matches = [
+        category for category, pattern in PREFILTER_PATTERNS
+        if len(pattern.findall(head)) >= AIConstants.PREFILTER_MIN_MATCHES
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+# Response schemas; the SDK schema converter rejects plain defaults, so
+# optional lists use default_factory
+class SecurityAssessment(BaseModel):
+    """Structured security assessment returned by the model."""
+    security_level: SecurityLevel
+    confidence: int
+    threats: List[str] = Field(default_factory=list)
+    indicators: List[str] = Field(default_factory=list)
+    recommendations: List[str] = Field(default_factory=list)
+
+
+class KeyInformation(BaseModel):
+    """Structured key information extracted by the model."""
+    dates: List[str] = Field(default_factory=list)
+    phone_numbers: List[str] = Field(default_factory=list)
+    email_addresses: List[str] = Field(default_factory=list)
+    links: List[str] = Field(default_factory=list)
+    money_amounts: List[str] = Field(default_factory=list)
+    important_info: List[str] = Field(default_factory=list)
+
+
+class EmailAnalysis(BaseModel):
+    """Summary, category and security assessment from a single request."""
+    summary: str
+    category: EmailCategory
+    security: SecurityAssessment
+
+
+def json_generation_config(schema: type, **overrides: Any) -> Dict[str, Any]:
+    """Generation config asking for JSON that matches schema."""
+    return {
+        **DEFAULT_GENERATION_CONFIG,
+        "response_mime_type": "application/json",
+        "response_schema": schema,
+        **overrides,
+    }
+
+
+@lru_cache(maxsize=32)
+def summary_generation_config(max_length: int) -> Dict[str, Any]:
+    """Generation config sized for a summary of max_length characters."""
+    return {
+        **DEFAULT_GENERATION_CONFIG,
+        "temperature": AIConstants.SUMMARY_TEMPERATURE,
+        "max_output_tokens": max(AIConstants.SUMMARY_MIN_TOKENS, max_length // 3),
+    }
+
+
+CATEGORY_GENERATION_CONFIG = {
+    **DEFAULT_GENERATION_CONFIG,
+    "max_output_tokens": AIConstants.CATEGORY_MAX_TOKENS,
+}
+SECURITY_GENERATION_CONFIG = json_generation_config(
+    SecurityAssessment, max_output_tokens=AIConstants.SECURITY_MAX_TOKENS
+)
+EXTRACT_GENERATION_CONFIG = json_generation_config(KeyInformation)
+ANALYSIS_GENERATION_CONFIG = json_generation_config(EmailAnalysis)
+
+
 class GeminiService:
     """Google Gemini AI service client."""
     
-    def __init__(self, api_key: str, model: str = "gemini-pro"):
-        """Initialize Gemini service."""
+    def __init__(self, api_key: str, model: str = "gemini-pro", fast_model: Optional[str] = None):
+        """Initialize Gemini service.
+        
+        model answers summaries and questions, where quality matters;
+        fast_model (defaulting to model) handles classification,
+        extraction and translation.
+        """
         self.api_key = api_key
         self.model_name = model
+        self.fast_model_name = fast_model or model
         self.logger = logging.getLogger(__name__)
         
-        # Configure Gemini
-        genai.configure(api_key=self.api_key)
+        # Shared, configured models with safety settings
+        self.model = get_model(self.api_key, self.model_name)
+        self.fast_model = get_model(self.api_key, self.fast_model_name)
+        self._semaphore = asyncio.Semaphore(AIConstants.MAX_CONCURRENT_REQUESTS)
         
-        # Initialize model with safety settings
-        self.model = genai.GenerativeModel(
-            model_name=self.model_name,
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            }
+        self.logger.info(
+            f"✅ Gemini service initialized with models: {self.model_name}, {self.fast_model_name}"
         )
-        
-        self.logger.info(f"✅ Gemini service initialized with model: {self.model_name}")
     
-    async def _generate_content(self, prompt: str, **kwargs) -> Optional[str]:
-        """Generate content using Gemini model."""
+    async def _generate_content(self, prompt: str, fast: bool = True, **kwargs) -> Optional[str]:
+        """Generate content using Gemini model with exact-prompt caching.
+        
+        Runs on the fast model unless fast is False.
+        """
+        if fast:
+            model, model_name = self.fast_model, self.fast_model_name
+        else:
+            model, model_name = self.model, self.model_name
+        
+        kwargs.setdefault("generation_config", DEFAULT_GENERATION_CONFIG)
+        content_hash = generate_content_hash(f"{prompt}{sorted(kwargs.items())}")
+        cached = cached_ai_response(content_hash, model_name)
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.model.generate_content(prompt, **kwargs)
+            async with self._semaphore:
+                response = await model.generate_content_async(prompt, **kwargs)
             
             if response.candidates and response.candidates[0].content.parts:
-                return response.candidates[0].content.parts[0].text.strip()
+                text = response.candidates[0].content.parts[0].text.strip()
+                cache_ai_response(content_hash, model_name, text)
+                return text
             else:
-                self.logger.warning("No valid response from Gemini")
+                finish_reason = response.candidates[0].finish_reason if response.candidates else None
+                self.logger.warning(f"No valid response from Gemini (finish reason: {finish_reason})")
                 return None
                 
         except Exception as e:
             self.logger.error(f"Gemini generation error: {e}")
             return None
     
-    async def summarize_email(self, email_content: str, max_length: int = 150) -> str:
-        """Generate a concise summary of an email."""
-        prompt = f"""
-Please provide a concise summary of the following email in {max_length} characters or less.
-Focus on the main points, key information, and any action items.
-
-Email content:
-{email_content}
-
-Summary:
+    async def _stream_content(self, prompt: str, **kwargs) -> AsyncGenerator[str, None]:
+        """Stream generated text chunks from the quality model, caching the full response once complete.
+        
+        Raises AIError if the stream fails, including after partial output.
+        """
+        kwargs.setdefault("generation_config", DEFAULT_GENERATION_CONFIG)
+        content_hash = generate_content_hash(f"{prompt}{sorted(kwargs.items())}")
+        cached = cached_ai_response(content_hash, self.model_name)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
+        try:
+            # A slot is held only while pulling from the model, never across a
+            # yield, so a slow consumer (throttled Telegram edits) can't pin it
+            async with self._semaphore:
+                response = await self.model.generate_content_async(prompt, stream=True, **kwargs)
+            stream = response.__aiter__()
+            while True:
+                async with self._semaphore:
+                    try:
+                        chunk = await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+                if chunk.candidates and chunk.candidates[0].content.parts:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            # Raise rather than end quietly, or a cut-off answer looks complete
+            self.logger.error(f"Gemini streaming error: {e}")
+            raise AIError(operation="streaming", reason=str(e)) from e
+        
+        text = "".join(chunks).strip()
+        if text:
+            cache_ai_response(content_hash, self.model_name, text)
+    
+    async def summarize_email(
+        self, 
+        email_content: str, 
+        max_length: int = 150,
+        cache_key: Optional[str] = None
+    ) -> str:
+        """Generate a concise summary of an email.
+        
+        Pass the Mailsac message ID as cache_key to reuse the summary
+        without rehashing the body.
         """
+        if cache_key:
+            summary_key = f"{cache_key}:{max_length}"
+            cached = cached_ai_response(summary_key, "summary")
+            if cached is not None:
+                return cached
+        
+        prompt = SUMMARY_PROMPT.format(
+            max_length=max_length,
+            content=truncate_body(email_content)
+        )
         
         try:
-            summary = await self._generate_content(prompt)
-            return summary or "Unable to generate summary for this email."
+            summary = await self._generate_content(
+                prompt, fast=False, generation_config=summary_generation_config(max_length)
+            )
+            if not summary:
+                return "Unable to generate summary for this email."
+            if cache_key:
+                cache_ai_response(summary_key, "summary", summary, ttl=AIConstants.SUMMARY_CACHE_TTL)
+            return summary
         except Exception as e:
             self.logger.error(f"Error summarizing email: {e}")
             return "Error occurred while generating summary."
@@ -95,78 +362,88 @@ Summary:
         question: str
     ) -> str:
         """Answer a specific question about email content."""
-        prompt = f"""
-Based on the following email content, please answer this question: "{question}"
-
-Provide a clear, accurate, and helpful response. If the information is not available in the email, please state that clearly.
-
-Email content:
-{email_content}
-
-Question: {question}
-
-Answer:
-        """
+        prompt = ANSWER_PROMPT.format(content=email_content, question=question)
         
         try:
-            answer = await self._generate_content(prompt)
+            answer = await self._generate_content(prompt, fast=False)
             return answer or "I couldn't find enough information in the email to answer your question."
         except Exception as e:
             self.logger.error(f"Error answering question: {e}")
             return "Error occurred while processing your question."
     
+    def stream_answer_question_about_email(
+        self, 
+        email_content: str, 
+        question: str
+    ) -> AsyncGenerator[str, None]:
+        """Answer a question about email content, yielding text as it is generated.
+        
+        Returns the underlying stream directly, so closing it closes the model stream.
+        """
+        prompt = ANSWER_PROMPT.format(content=email_content, question=question)
+        return self._stream_content(prompt)
+    
     async def categorize_email(self, email_content: str) -> EmailCategory:
         """Categorize email into predefined categories."""
-        prompt = f"""
-Analyze the following email and categorize it into one of these categories:
-- spam: Unwanted promotional or malicious emails
-- promotional: Marketing emails from legitimate businesses
-- personal: Personal communication from individuals
-- business: Professional/work-related emails
-- verification: Account verification, password resets, confirmations
-- newsletter: Subscribed newsletters and updates
-- security: Security alerts, warnings, notifications
-- unknown: Cannot be clearly categorized
-
-Email content:
-{email_content}
-
-Respond with only the category name (lowercase).
-        """
+        category = prefilter_category(email_content)
+        if category is not None:
+            return category
+        
+        prompt = CATEGORY_PROMPT.format(content=truncate_body(email_content))
         
         try:
-            result = await self._generate_content(prompt)
-            if result:
-                category_str = result.lower().strip()
-                try:
-                    return EmailCategory(category_str)
-                except ValueError:
-                    pass
-            
-            return EmailCategory.UNKNOWN
+            result = await self._generate_content(prompt, generation_config=CATEGORY_GENERATION_CONFIG)
+            words = result.lower().split() if result else ()
+            return CATEGORY_BY_NAME.get(words[0].strip('.') if words else "", EmailCategory.UNKNOWN)
         except Exception as e:
             self.logger.error(f"Error categorizing email: {e}")
             return EmailCategory.UNKNOWN
     
+    async def batch_categorize_emails(self, emails: List[str]) -> List[EmailCategory]:
+        """Categorize several emails with one request per batch instead of one per email."""
+        # Greedily pack truncated bodies into batches under the character budget
+        batches: List[List[str]] = []
+        size = AIConstants.BATCH_CHAR_BUDGET
+        for email_content in emails:
+            email_content = truncate_body(email_content, AIConstants.BATCH_EMAIL_CHAR_BUDGET)
+            if size + len(email_content) > AIConstants.BATCH_CHAR_BUDGET:
+                batches.append([])
+                size = 0
+            batches[-1].append(email_content)
+            size += len(email_content)
+        
+        results = await asyncio.gather(*(self._categorize_batch(batch) for batch in batches))
+        return [category for batch_result in results for category in batch_result]
+    
+    async def _categorize_batch(self, emails: List[str]) -> List[EmailCategory]:
+        """Categorize one batch, mapping unparsed or missing lines to UNKNOWN."""
+        categories = [EmailCategory.UNKNOWN] * len(emails)
+        prompt = BATCH_CATEGORY_PROMPT.format(
+            count=len(emails),
+            emails="\n\n".join(f"{i}: {email_content}" for i, email_content in enumerate(emails, 1))
+        )
+        
+        try:
+            result = await self._generate_content(prompt)
+        except Exception as e:
+            self.logger.error(f"Error batch categorizing emails: {e}")
+            return categories
+        
+        for number, category_str in BATCH_LINE_PATTERN.findall((result or "").lower()):
+            index = int(number) - 1
+            if 0 <= index < len(categories):
+                categories[index] = CATEGORY_BY_NAME.get(category_str, EmailCategory.UNKNOWN)
+        
+        return categories
+    
     async def assess_email_security(self, email_content: str) -> Dict[str, Any]:
         """Assess email for security threats and spam indicators."""
-        prompt = f"""
-Analyze this email for security threats and spam indicators. Provide assessment in this format:
-
-SECURITY_LEVEL: [safe/suspicious/dangerous]
-CONFIDENCE: [0-100]
-THREATS: [list any threats found]
-INDICATORS: [list spam/phishing indicators]
-RECOMMENDATIONS: [safety recommendations]
-
-Email content:
-{email_content}
-
-Assessment:
-        """
+        prompt = SECURITY_PROMPT.format(content=truncate_body(email_content))
         
         try:
-            assessment = await self._generate_content(prompt)
+            assessment = await self._generate_content(
+                prompt, generation_config=SECURITY_GENERATION_CONFIG
+            )
             if not assessment:
                 return {
                     "security_level": SecurityLevel.UNKNOWN,
@@ -176,31 +453,7 @@ Assessment:
                     "recommendations": ["Unable to assess email security"]
                 }
             
-            # Parse assessment (simplified parsing)
-            lines = assessment.split('\n')
-            result = {
-                "security_level": SecurityLevel.UNKNOWN,
-                "confidence": 0,
-                "threats": [],
-                "indicators": [],
-                "recommendations": []
-            }
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('SECURITY_LEVEL:'):
-                    level_str = line.split(':', 1)[1].strip().lower()
-                    try:
-                        result["security_level"] = SecurityLevel(level_str)
-                    except ValueError:
-                        pass
-                elif line.startswith('CONFIDENCE:'):
-                    try:
-                        result["confidence"] = int(line.split(':', 1)[1].strip())
-                    except ValueError:
-                        pass
-            
-            return result
+            return SecurityAssessment.model_validate_json(assessment).model_dump()
             
         except Exception as e:
             self.logger.error(f"Error assessing email security: {e}")
@@ -212,21 +465,43 @@ Assessment:
                 "recommendations": ["Manual review recommended"]
             }
     
+    async def analyze_email(self, email_content: str, max_length: int = 150) -> Dict[str, Any]:
+        """Summarize, categorize and assess an email in one request.
+        
+        Use this instead of awaiting summarize_email, categorize_email and
+        assess_email_security separately when all three are needed.
+        """
+        prompt = ANALYSIS_PROMPT.format(
+            max_length=max_length,
+            content=truncate_body(email_content)
+        )
+        
+        try:
+            analysis = await self._generate_content(
+                prompt, fast=False, generation_config=ANALYSIS_GENERATION_CONFIG
+            )
+            if analysis:
+                return EmailAnalysis.model_validate_json(analysis).model_dump()
+        except Exception as e:
+            self.logger.error(f"Error analyzing email: {e}")
+        
+        return {
+            "summary": "Unable to generate summary for this email.",
+            "category": EmailCategory.UNKNOWN,
+            "security": SecurityAssessment(
+                security_level=SecurityLevel.UNKNOWN,
+                confidence=0,
+                recommendations=["Manual review recommended"]
+            ).model_dump()
+        }
+    
     async def translate_email(
         self, 
         email_content: str, 
         target_language: str = "en"
     ) -> str:
         """Translate email content to specified language."""
-        prompt = f"""
-Translate the following email content to {target_language}. 
-Maintain the original formatting and tone as much as possible.
-
-Email content:
-{email_content}
-
-Translation:
-        """
+        prompt = TRANSLATE_PROMPT.format(target_language=target_language, content=email_content)
         
         try:
             translation = await self._generate_content(prompt)
@@ -237,40 +512,16 @@ Translation:
     
     async def extract_key_information(self, email_content: str) -> Dict[str, List[str]]:
         """Extract key information like dates, phone numbers, links, etc."""
-        prompt = f"""
-Extract key information from this email and organize it into categories:
-
-DATES: [any dates mentioned]
-PHONE_NUMBERS: [any phone numbers]
-EMAIL_ADDRESSES: [any email addresses]
-LINKS: [any URLs or links]
-MONEY_AMOUNTS: [any monetary amounts]
-IMPORTANT_INFO: [any other important information]
-
-Email content:
-{email_content}
-
-Extracted information:
-        """
+        prompt = EXTRACT_PROMPT.format(content=truncate_body(email_content))
         
         try:
-            extraction = await self._generate_content(prompt)
-            # Simplified parsing - in production, you'd want more robust parsing
-            return {
-                "dates": [],
-                "phone_numbers": [],
-                "email_addresses": [],
-                "links": [],
-                "money_amounts": [],
-                "important_info": [extraction or "No key information extracted"]
-            }
+            extraction = await self._generate_content(
+                prompt, generation_config=EXTRACT_GENERATION_CONFIG
+            )
+            if not extraction:
+                return KeyInformation(important_info=["No key information extracted"]).model_dump()
+            
+            return KeyInformation.model_validate_json(extraction).model_dump()
         except Exception as e:
             self.logger.error(f"Error extracting information: {e}")
-            return {
-                "dates": [],
-                "phone_numbers": [],
-                "email_addresses": [],
-                "links": [],
-                "money_amounts": [],
-                "important_info": ["Error during information extraction"]
-            }
\ No newline at end of file
+            return KeyInformation(important_info=["Error during information extraction"]).model_dump()
@@ -2,22 +2,69 @@
 Mailsac API client service with caching and improved error handling
 """
 
+import asyncio
 import logging
+import random
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 import aiohttp
-from pydantic import BaseModel, ValidationError
+import orjson
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from src.config.constants import APIConstants, LogConstants, StatusCode
 from src.config.exceptions import APIError, EmailError, ErrorCode
 from src.bot.utils.cache import (
+    MemoryCache,
+    SingleFlight,
     cached_email_messages, 
     cache_email_messages,
+    invalidate_email_messages,
     cached_email_content,
-    cache_email_content
+    cache_email_content,
+    invalidate_email_content,
+    invalidate_all_email_content
 )
 
+# Cache marker for message IDs that Mailsac reported as missing
+_MISSING_MESSAGE = object()
+
+# One pooled session per process, so every service instance reuses live TLS sockets
+_shared_session: Optional[aiohttp.ClientSession] = None
+_session_lock = asyncio.Lock()
+
+
+async def get_shared_session() -> aiohttp.ClientSession:
+    """Get or lazily create the process-wide HTTP session."""
+    global _shared_session
+    if _shared_session is not None and not _shared_session.closed:
+        return _shared_session
+    
+    async with _session_lock:
+        if _shared_session is None or _shared_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,  # Total connection pool size
+                limit_per_host=30,  # Per host connection limit
+                ttl_dns_cache=300,  # DNS cache TTL
+                use_dns_cache=True,
+                keepalive_timeout=APIConstants.KEEPALIVE_TIMEOUT,
+            )
+            _shared_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=APIConstants.API_TIMEOUT, connect=10)
+            )
+    
+    return _shared_session
+
+
+async def close_shared_session() -> None:
+    """Close the process-wide HTTP session."""
+    global _shared_session
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
+
 
 class EmailMessage(BaseModel):
     """Email message model."""
@@ -27,7 +74,35 @@ class EmailMessage(BaseModel):
     subject: str
     received: datetime
     body: Optional[str] = None
-    attachments: List[Dict[str, Any]] = []
+    # Listings only carry the count; details come from get_attachments on demand
+    attachment_count: int = 0
+    
+    @property
+    def prompt(self) -> str:
+        """Email rendered as AI prompt input.
+        
+        Not cached: model_copy carries __dict__ over, so a cached prompt
+        would go stale when the copy updates the body.
+        """
+        return f"Subject: {self.subject}\n\nContent: {self.body or 'No content'}"
+
+
+@lru_cache(maxsize=256)
+def build_url(base_url: str, endpoint: str) -> str:
+    """Join base URL and endpoint, memoised per distinct endpoint."""
+    return f"{base_url}/{endpoint.lstrip('/')}"
+
+
+# Validates a whole inbox listing in one pydantic-core call
+_MESSAGE_LIST = TypeAdapter(List[EmailMessage])
+
+
+def retry_delay(retry_count: int) -> float:
+    """Capped exponential backoff with a little jitter."""
+    return (
+        min(APIConstants.RETRY_BACKOFF ** retry_count, APIConstants.MAX_RETRY_DELAY)
+        + random.random() * APIConstants.RETRY_JITTER
+    )
 
 
 class MailsacService:
@@ -45,37 +120,19 @@ class MailsacService:
             'Content-Type': 'application/json'
         }
         
-        # Connection session for pooling
-        self._session: Optional[aiohttp.ClientSession] = None
+        # ETag validators and last inbox listings for conditional GETs (endpoint -> (etag, payload))
+        self._etag_cache = MemoryCache()
         
-        # Timeout configuration
-        self._timeout = aiohttp.ClientTimeout(
-            total=APIConstants.API_TIMEOUT,
-            connect=10
-        )
+        # Concurrent identical lookups share one upstream request
+        self._single_flight = SingleFlight()
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Get or create HTTP session with connection pooling."""
-        if self._session is None or self._session.closed:
-            connector = aiohttp.TCPConnector(
-                limit=100,  # Total connection pool size
-                limit_per_host=30,  # Per host connection limit
-                ttl_dns_cache=300,  # DNS cache TTL
-                use_dns_cache=True,
-            )
-            
-            self._session = aiohttp.ClientSession(
-                connector=connector,
-                timeout=self._timeout,
-                headers=self.headers
-            )
-        
-        return self._session
+        """Get the shared pooled HTTP session."""
+        return await get_shared_session()
     
     async def close(self) -> None:
-        """Close HTTP session."""
-        if self._session and not self._session.closed:
-            await self._session.close()
+        """Close the shared HTTP session."""
+        await close_shared_session()
     
     async def _make_request(
         self, 
@@ -85,7 +142,7 @@ class MailsacService:
         **kwargs
     ) -> Dict[str, Any]:
         """Make HTTP request to Mailsac API with retry logic."""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        url = build_url(self.base_url, endpoint)
         
         # Log API request
         self.logger.debug(
@@ -98,21 +155,49 @@ class MailsacService:
         
         session = await self._get_session()
         
+        # Revalidate previously seen inbox listings instead of re-downloading them.
+        # Only listings: message bodies must not outlive the content cache TTL.
+        revalidate = method == 'GET' and endpoint.endswith('/messages')
+        conditional = self._etag_cache.get(endpoint) if revalidate else None
+        # The session is shared, so the API key travels per request;
+        # the base headers are only copied when something is added
+        headers = self.headers
+        extra_headers = kwargs.pop('headers', None)
+        if extra_headers or conditional is not None:
+            headers = {**headers, **(extra_headers or {})}
+            if conditional is not None:
+                headers['If-None-Match'] = conditional[0]
+        
         try:
             async with session.request(
                 method=method,
                 url=url,
+                headers=headers,
                 **kwargs
             ) as response:
-                response_text = await response.text()
+                body = await response.read()
                 
-                if response.status == StatusCode.OK.value:
-                    return await response.json() if response_text else {}
+                if response.status == StatusCode.OK:
+                    payload = orjson.loads(body) if body else {}
+                    etag = response.headers.get('ETag')
+                    if revalidate and etag:
+                        self._etag_cache.set(
+                            endpoint, (etag, payload), ttl=APIConstants.ETAG_TTL_SECONDS
+                        )
+                    return payload
+                
+                elif response.status == StatusCode.NOT_MODIFIED and conditional is not None:
+                    # Still current: keep the validator alive for further polls
+                    self._etag_cache.set(endpoint, conditional, ttl=APIConstants.ETAG_TTL_SECONDS)
+                    return conditional[1]
                 
-                elif response.status == StatusCode.NOT_FOUND.value:
+                elif response.status == StatusCode.NOT_FOUND:
                     return {}  # Empty response for not found
                 
-                elif response.status == StatusCode.UNAUTHORIZED.value:
+                # Only error paths need the body as text
+                response_text = body.decode('utf-8', errors='replace')
+                
+                if response.status == StatusCode.UNAUTHORIZED:
                     self.logger.error("Mailsac API unauthorized - check API key")
                     raise APIError(
                         service="Mailsac",
@@ -121,14 +206,15 @@ class MailsacService:
                         error_code=ErrorCode.API_UNAUTHORIZED_ERROR
                     )
                 
-                elif response.status == StatusCode.TOO_MANY_REQUESTS.value:
+                elif response.status == StatusCode.TOO_MANY_REQUESTS:
                     # Retry with exponential backoff for rate limits
                     if retry_count < APIConstants.MAX_RETRIES:
-                        import asyncio
-                        delay = APIConstants.RETRY_BACKOFF ** retry_count
-                        self.logger.warning(f"Rate limited, retrying in {delay}s")
+                        delay = retry_delay(retry_count)
+                        self.logger.warning(f"Rate limited, retrying in {delay:.1f}s")
                         await asyncio.sleep(delay)
-                        return await self._make_request(method, endpoint, retry_count + 1, **kwargs)
+                        return await self._make_request(
+                            method, endpoint, retry_count + 1, headers=extra_headers, **kwargs
+                        )
                     
                     raise APIError(
                         service="Mailsac",
@@ -140,11 +226,12 @@ class MailsacService:
                 elif response.status >= 500:
                     # Retry for server errors
                     if retry_count < APIConstants.MAX_RETRIES:
-                        import asyncio
-                        delay = APIConstants.RETRY_BACKOFF ** retry_count
-                        self.logger.warning(f"Server error, retrying in {delay}s")
+                        delay = retry_delay(retry_count)
+                        self.logger.warning(f"Server error, retrying in {delay:.1f}s")
                         await asyncio.sleep(delay)
-                        return await self._make_request(method, endpoint, retry_count + 1, **kwargs)
+                        return await self._make_request(
+                            method, endpoint, retry_count + 1, headers=extra_headers, **kwargs
+                        )
                     
                     raise APIError(
                         service="Mailsac",
@@ -169,13 +256,14 @@ class MailsacService:
                         error_code=ErrorCode.API_CONNECTION_ERROR
                     )
         
-        except aiohttp.ClientTimeout:
+        except asyncio.TimeoutError:
             if retry_count < APIConstants.MAX_RETRIES:
-                import asyncio
-                delay = APIConstants.RETRY_BACKOFF ** retry_count
-                self.logger.warning(f"Request timeout, retrying in {delay}s")
+                delay = retry_delay(retry_count)
+                self.logger.warning(f"Request timeout, retrying in {delay:.1f}s")
                 await asyncio.sleep(delay)
-                return await self._make_request(method, endpoint, retry_count + 1, **kwargs)
+                return await self._make_request(
+                    method, endpoint, retry_count + 1, headers=extra_headers, **kwargs
+                )
             
             raise APIError(
                 service="Mailsac",
@@ -193,8 +281,21 @@ class MailsacService:
                 error_code=ErrorCode.API_CONNECTION_ERROR
             )
     
+    async def _head(self, endpoint: str) -> int:
+        """Issue a HEAD request and return only the status code."""
+        session = await self._get_session()
+        async with session.head(build_url(self.base_url, endpoint), headers=self.headers) as response:
+            return response.status
+    
     async def get_messages(self, email_address: str) -> List[EmailMessage]:
         """Get messages for an email address with caching."""
+        return await self._single_flight.do(
+            f"messages:{email_address}",
+            lambda: self._get_messages(email_address)
+        )
+    
+    async def _get_messages(self, email_address: str) -> List[EmailMessage]:
+        """Fetch and cache messages for an email address."""
         try:
             # Check cache first
             cached_messages = cached_email_messages(email_address)
@@ -202,7 +303,7 @@ class MailsacService:
                 return cached_messages
             
             # Extract local part of email (before @)
-            local_part = email_address.split('@')[0]
+            local_part = email_address.partition('@')[0]
             
             # Get messages from API
             response = await self._make_request(
@@ -210,23 +311,11 @@ class MailsacService:
                 f'/addresses/{local_part}/messages'
             )
             
-            messages = []
-            for msg_data in response:
-                try:
-                    # Parse message data
-                    message = EmailMessage(
-                        id=msg_data.get('_id', ''),
-                        from_address=msg_data.get('from', [{}])[0].get('address', ''),
-                        to_address=email_address,
-                        subject=msg_data.get('subject', 'No Subject'),
-                        received=datetime.fromisoformat(
-                            msg_data.get('received', '').replace('Z', '+00:00')
-                        )
-                    )
-                    messages.append(message)
-                except (ValidationError, ValueError) as e:
-                    self.logger.warning(f"Failed to parse message: {e}")
-                    continue
+            # Small listings are cheaper to validate inline than to hand to a thread
+            if len(response) < APIConstants.OFFLOAD_PARSE_MIN_MESSAGES:
+                messages = self._parse_messages(response, email_address)
+            else:
+                messages = await asyncio.to_thread(self._parse_messages, response, email_address)
             
             # Cache the results
             cache_email_messages(email_address, messages, ttl=60)
@@ -245,19 +334,60 @@ class MailsacService:
                 error_code=ErrorCode.EMAIL_FETCH_FAILED
             )
     
+    def _parse_messages(self, response: List[Dict[str, Any]], email_address: str) -> List[EmailMessage]:
+        """Validate a raw inbox listing into EmailMessage objects."""
+        # pydantic-core parses the ISO 'received' strings itself
+        rows = [
+            {
+                'id': msg_data.get('_id', ''),
+                'from_address': msg_data.get('from', [{}])[0].get('address', ''),
+                'to_address': email_address,
+                'subject': msg_data.get('subject', 'No Subject'),
+                'received': msg_data.get('received', ''),
+                'attachment_count': len(msg_data.get('attachments') or ()),
+            }
+            for msg_data in response
+        ]
+        
+        try:
+            messages = _MESSAGE_LIST.validate_python(rows)
+        except ValidationError:
+            # Rare malformed entry: validate one by one and skip the bad ones
+            messages = []
+            for row in rows:
+                try:
+                    messages.append(EmailMessage.model_validate(row))
+                except ValidationError as e:
+                    self.logger.warning(f"Failed to parse message: {e}")
+        
+        return messages
+    
     async def get_message_content(
         self, 
         email_address: str, 
         message_id: str
     ) -> Optional[EmailMessage]:
         """Get full message content including body with caching."""
+        return await self._single_flight.do(
+            f"content:{email_address}:{message_id}",
+            lambda: self._get_message_content(email_address, message_id)
+        )
+    
+    async def _get_message_content(
+        self, 
+        email_address: str, 
+        message_id: str
+    ) -> Optional[EmailMessage]:
+        """Fetch and cache full message content."""
         try:
             # Check cache first
             cached_content = cached_email_content(email_address, message_id)
+            if cached_content is _MISSING_MESSAGE:
+                return None
             if cached_content is not None:
                 return cached_content
             
-            local_part = email_address.split('@')[0]
+            local_part = email_address.partition('@')[0]
             
             # Get message body
             response = await self._make_request(
@@ -266,6 +396,8 @@ class MailsacService:
             )
             
             if not response:
+                # Briefly remember misses so repeated lookups don't hammer the API
+                cache_email_content(email_address, message_id, _MISSING_MESSAGE, ttl=30)
                 return None
             
             # Parse full message
@@ -297,15 +429,85 @@ class MailsacService:
                 error_code=ErrorCode.EMAIL_FETCH_FAILED
             )
     
+    async def get_message_contents(
+        self, 
+        email_address: str, 
+        message_ids: List[str],
+        return_exceptions: bool = False
+    ) -> List[Any]:
+        """Fetch several message bodies concurrently, warming the content cache.
+        
+        With return_exceptions, a failed fetch yields its exception in place
+        instead of failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(APIConstants.MAX_CONCURRENT_FETCHES)
+        
+        async def fetch(message_id: str) -> Optional[EmailMessage]:
+            async with semaphore:
+                return await self.get_message_content(email_address, message_id)
+        
+        return list(await asyncio.gather(
+            *(fetch(message_id) for message_id in message_ids),
+            return_exceptions=return_exceptions
+        ))
+    
+    async def get_messages_with_bodies(
+        self, 
+        email_address: str, 
+        limit: int = 50
+    ) -> List[EmailMessage]:
+        """Get up to limit messages with bodies, fetching the bodies concurrently.
+        
+        A message whose body cannot be fetched is returned as listed, without a body.
+        """
+        messages = (await self.get_messages(email_address))[:limit]
+        contents = await self.get_message_contents(
+            email_address,
+            [message.id for message in messages],
+            return_exceptions=True
+        )
+        
+        results = []
+        for message, content in zip(messages, contents):
+            if isinstance(content, BaseException):
+                self.logger.warning(f"Failed to fetch body for message {message.id}: {content}")
+                content = None
+            results.append(content or message)
+        
+        return results
+    
+    async def get_attachments(self, email_address: str, message_id: str) -> List[Dict[str, Any]]:
+        """Get attachment metadata for a message, fetched only when asked for."""
+        try:
+            local_part = email_address.partition('@')[0]
+            response = await self._make_request(
+                'GET',
+                f'/addresses/{local_part}/messages/{message_id}/attachments'
+            )
+            return response if isinstance(response, list) else []
+            
+        except APIError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error fetching attachments: {e}")
+            raise EmailError(
+                operation="get attachments",
+                email_address=email_address,
+                reason=str(e),
+                error_code=ErrorCode.EMAIL_FETCH_FAILED
+            )
+    
     async def delete_message(self, email_address: str, message_id: str) -> bool:
         """Delete a specific message."""
         try:
-            local_part = email_address.split('@')[0]
+            local_part = email_address.partition('@')[0]
             
             await self._make_request(
                 'DELETE',
                 f'/addresses/{local_part}/messages/{message_id}'
             )
+            invalidate_email_content(email_address, message_id)
+            invalidate_email_messages(email_address)
             
             self.logger.info(f"Deleted message {message_id} from {email_address}")
             return True
@@ -317,13 +519,17 @@ class MailsacService:
     async def delete_all_messages(self, email_address: str) -> bool:
         """Delete all messages for an email address."""
         try:
-            local_part = email_address.split('@')[0]
+            local_part = email_address.partition('@')[0]
             
             await self._make_request(
                 'DELETE',
                 f'/addresses/{local_part}/messages'
             )
             
+            # Drop every cached body for the address, listed or not, then the listing
+            invalidate_all_email_content(email_address)
+            invalidate_email_messages(email_address)
+            
             self.logger.info(f"Deleted all messages for {email_address}")
             return True
             
@@ -332,9 +538,14 @@ class MailsacService:
             return False
     
     async def check_email_availability(self, email_address: str) -> bool:
-        """Check if an email address is available."""
+        """Check if an email address is available.
+        
+        A HEAD probe confirms the inbox endpoint answers without downloading
+        or parsing the listing; 404 still means the namespace is reachable.
+        """
+        local_part = email_address.partition('@')[0]
         try:
-            messages = await self.get_messages(email_address)
-            return True  # If no error, email is accessible
-        except Exception:
-            return False
\ No newline at end of file
+            status = await self._head(f'/addresses/{local_part}/messages')
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+        return status in (StatusCode.OK, StatusCode.NOT_FOUND)
\ No newline at end of file
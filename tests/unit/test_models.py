@@ -0,0 +1,39 @@
+"""
+Unit tests for data models
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from src.models.email import EmailMessage
+
+
+class TestEmailMessage:
+    """Test the email message model."""
+    
+    @staticmethod
+    def _message(from_address: str) -> EmailMessage:
+        return EmailMessage(
+            id="msg1",
+            from_address=from_address,
+            to_address="user@mailsac.com",
+            received="2024-01-01T00:00:00"
+        )
+    
+    def test_valid_address(self):
+        """Test an ordinary address is accepted."""
+        assert self._message("first.last+tag@mail.example.com").from_address == "first.last+tag@mail.example.com"
+    
+    @pytest.mark.parametrize("address", [
+        "a" * 250 + "@b.com",  # over MAX_EMAIL_LENGTH
+        "user@@example.com",
+        "user@example",
+        "user@example.c0m",
+        "us er@example.com",
+        "user@example.com\n",
+        "üser@example.com",
+    ])
+    def test_invalid_address(self, address):
+        """Test over-long, malformed and non-ASCII addresses are rejected."""
+        with pytest.raises(ValidationError):
+            self._message(address)
@@ -0,0 +1,128 @@
+"""
+Unit tests for bot utilities
+"""
+
+import time
+
+import pytest
+
+from src.bot.utils.cache import CounterCache, MemoryCache, cache_result, clear_cache
+from src.bot.utils.email import USERNAME_ALPHABET, extract_plain_text, generate_random_email
+from src.bot.utils.validation import validate_question
+
+
+class TestValidation:
+    """Test input validation helpers."""
+    
+    def test_validate_question_keeps_punctuation(self):
+        """Test ordinary punctuation survives sanitization."""
+        question = "What's the code, and who sent it? Is it $50!"
+        assert validate_question(question) == question
+    
+    def test_validate_question_strips_blocked_patterns(self):
+        """Test script tags are still removed."""
+        assert validate_question("Who sent <script>alert(1)</script>this?") == "Who sent this?"
+
+
+class TestMemoryCache:
+    """Test the TTL + LRU memory cache."""
+    
+    def test_expiry_heap_stays_bounded_on_overwrites(self):
+        """Test re-setting one key does not grow the expiry heap without bound."""
+        cache = MemoryCache()
+        for i in range(5000):
+            cache.set("etag", i, ttl=3600)
+        
+        assert cache.get("etag") == 4999
+        assert len(cache._expiry_heap) <= 2 * len(cache.cache)
+    
+    def test_delete_compacts_expiry_heap(self):
+        """Test deleted keys do not leave their heap entries behind."""
+        cache = MemoryCache()
+        for i in range(10):
+            cache.set(i, i)
+        for i in range(10):
+            cache.delete(i)
+        
+        assert cache._expiry_heap == []
+
+
+class TestCounterCache:
+    """Test the least-frequently-used AI response cache."""
+    
+    def test_expired_entries_are_evicted_first(self, monkeypatch):
+        """Test expired popular entries give up their slots to new ones."""
+        now = [1000.0]
+        monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+        cache = CounterCache(max_size=3)
+        for key in ("a", "b", "c"):
+            cache.set(key, key, ttl=10)
+            for _ in range(5):
+                cache.get(key)
+        
+        now[0] += 60
+        cache.set("new1", 1)
+        cache.set("new2", 2)
+        
+        assert cache.get("new1") == 1
+        assert cache.get("new2") == 2
+    
+    def test_least_frequently_used_is_evicted(self):
+        """Test a read entry outlives unread ones, oldest unread going first."""
+        cache = CounterCache(max_size=2)
+        cache.set("hot", 1)
+        cache.get("hot")
+        cache.set("cold", 2)
+        cache.set("new", 3)
+        
+        assert set(cache.cache) == {"hot", "new"}
+    
+    def test_counts_are_halved_at_max_count(self):
+        """Test counts decay once one reaches MAX_COUNT."""
+        cache = CounterCache()
+        cache.MAX_COUNT = 8
+        cache.set("a", 1)
+        cache.set("b", 2)
+        for _ in range(7):
+            cache.get("a")
+        
+        assert cache.counts == {"a": 4, "b": 0}
+
+
+class TestEmailUtils:
+    """Test email helpers."""
+    
+    def test_generate_random_email(self):
+        """Test usernames are 8-12 characters from the full alphanumeric alphabet."""
+        usernames = [generate_random_email("mailsac.com") for _ in range(200)]
+        
+        for address in usernames:
+            username, _, domain = address.partition('@')
+            assert domain == "mailsac.com"
+            assert 8 <= len(username) <= 12
+            assert set(username) <= set(USERNAME_ALPHABET)
+        assert set("".join(usernames)) - set("0123456789abcdef")
+    
+    def test_extract_plain_text_strips_tags_after_long_preamble(self):
+        """Test tags are stripped even when they start late in the body."""
+        body = "x" * 600 + " <p>Hello <b>there</b></p>"
+        assert extract_plain_text(body) == "x" * 600 + " Hello there"
+
+
+class TestCacheResult:
+    """Test the result-caching decorator."""
+    
+    @pytest.mark.asyncio
+    async def test_equal_arguments_of_different_types_are_cached_apart(self):
+        """Test 1, 1.0 and True do not share a cache entry."""
+        clear_cache()
+        
+        @cache_result(key_prefix="test")
+        async def describe(value):
+            return repr(value)
+        
+        assert await describe(1) == "1"
+        assert await describe(True) == "True"
+        assert await describe(1.0) == "1.0"
+        assert await describe(value=1) == "1"
+        assert await describe(value=True) == "True"